@@ -0,0 +1,152 @@
+import os
+import asyncio
+import logging
+import sqlite3
+from collections import Counter
+from typing import List, Optional
+
+from db import Database, db
+
+# Write-behind logger for task_history.
+# Events are queued in memory and written by one background flusher in
+# batches: every batch is a single transaction holding all of its inserts plus
+# one aggregated task_count update per user. Callers that need the row on disk
+# (or its id) pass durable=True and wait for the commit of their batch.
+
+ACTIVITY_FLUSH_INTERVAL_MS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_MS", "200"))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+ACTIVITY_BUFFER_MAX = int(os.getenv("ACTIVITY_BUFFER_MAX", "10000"))
+ACTIVITY_LOG_DURABLE = os.getenv("ACTIVITY_LOG_DURABLE", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityEvent:
+    __slots__ = ("row", "count_task", "future")
+
+    def __init__(self, row: tuple, count_task: bool, future: Optional[asyncio.Future]):
+        self.row = row
+        self.count_task = count_task
+        self.future = future
+
+
+def write_batch(conn: sqlite3.Connection, events: List[ActivityEvent]) -> List[int]:
+    ids = [
+        conn.execute('''
+            INSERT INTO task_history (user_id, task_type, command, status, details)
+            VALUES (?, ?, ?, ?, ?)
+        ''', event.row).lastrowid
+        for event in events
+    ]
+    increments = Counter(event.row[0] for event in events if event.count_task)
+    if increments:
+        conn.executemany('''
+            UPDATE user_profiles
+            SET task_count = task_count + ?
+            WHERE uid = ?
+        ''', [(count, user_id) for user_id, count in increments.items()])
+    return ids
+
+
+class ActivityLog:
+    """Bounded write-behind buffer for task_history rows"""
+
+    def __init__(self, database: Database = db, flush_interval_ms: float = ACTIVITY_FLUSH_INTERVAL_MS,
+                 batch_size: int = ACTIVITY_BATCH_SIZE, max_buffer: int = ACTIVITY_BUFFER_MAX,
+                 durable: bool = ACTIVITY_LOG_DURABLE):
+        self.db = database
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.durable = durable
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.counters = {"recorded": 0, "written": 0, "batches": 0, "failed": 0}
+
+    async def start(self):
+        if self._flusher is None:
+            self._queue = asyncio.Queue(self.max_buffer)
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Write everything still buffered, then stop the flusher"""
+        if self._flusher is None:
+            return
+        await self._queue.join()
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        self._queue = None
+
+    async def record(self, user_id: str, task_type: str, command: Optional[str], status: str,
+                     details: Optional[str] = None, count_task: bool = False,
+                     durable: Optional[bool] = None) -> Optional[int]:
+        """Queue one task_history row; with durable=True, wait for its commit and return its id
+
+        count_task also increments the user's task_count. A full buffer makes
+        callers wait for the flusher instead of growing without bound.
+        """
+        self.counters["recorded"] += 1
+        row = (user_id, task_type, command, status, details)
+        if self._flusher is None:
+            # Not started (scripts, tests): write straight through
+            return (await self.db.run(write_batch, [ActivityEvent(row, count_task, None)]))[0]
+
+        wait = self.durable if durable is None else durable
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self._queue.put(ActivityEvent(row, count_task, future))
+        if future is not None:
+            return await future
+        return None
+
+    async def _collect(self) -> List[ActivityEvent]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            # Someone is waiting on this batch: commit now rather than at the interval
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0 or any(event.future is not None for event in batch):
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                ids = await self.db.run(write_batch, batch)
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+                for event, row_id in zip(batch, ids):
+                    if event.future is not None and not event.future.done():
+                        event.future.set_result(row_id)
+            except Exception as e:
+                self.counters["failed"] += len(batch)
+                logger.error("Dropped %d task_history rows: %s", len(batch), e)
+                for event in batch:
+                    if event.future is not None and not event.future.done():
+                        event.future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "buffered": self._queue.qsize() if self._queue is not None else 0,
+            "durable_default": self.durable,
+        }
+
+
+activity_log = ActivityLog()
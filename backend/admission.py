@@ -0,0 +1,284 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from permissions import RoleCache, role_cache
+
+# Admission control for the LLM-backed endpoints.
+# Every registered user whose bearer token verifies gets a token bucket per
+# endpoint, refilled at their plan's rate from user_profiles.plan; everyone
+# else, including callers that only name a user_id in the query or form,
+# shares a bucket per client IP at the anonymous rate; behind a proxy listed in
+# ADMISSION_TRUSTED_PROXIES the client IP is taken from X-Forwarded-For.
+# Requests that will not reach an endpoint (404/405) are passed through
+# uncharged. A command that /task-execute hands to another endpoint's work is
+# recharged at that endpoint's cost (reroute). An empty bucket is a 429 with
+# Retry-After. Admitted
+# requests then share a global concurrency ceiling with a bounded FIFO wait
+# queue, and are turned away at once when that queue is full. The slot is held
+# until the response body (including streams) has been sent.
+
+# Requests per minute per user and endpoint, by plan ("plan:rate,...")
+ADMISSION_PLAN_RATES = {
+    plan.strip(): float(rate)
+    for plan, rate in (
+        item.split(":") for item in os.getenv(
+            "ADMISSION_PLAN_RATES", "anonymous:10,free:30,pro:120,enterprise:600"
+        ).split(",") if item.strip()
+    )
+}
+# Bucket size in seconds of refill, so short bursts pass
+ADMISSION_BURST_SECONDS = float(os.getenv("ADMISSION_BURST_SECONDS", "20"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+ADMISSION_MAX_BUCKETS = int(os.getenv("ADMISSION_MAX_BUCKETS", "100000"))
+# Peer addresses allowed to name the client in X-Forwarded-For (e.g. the Vite dev proxy)
+ADMISSION_TRUSTED_PROXIES = frozenset(
+    address.strip() for address in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if address.strip()
+)
+
+# Tokens one call takes; /yt-summary fans out to several YouTube and LLM calls
+ENDPOINT_COSTS = {
+    "/llm-process": 1.0,
+    "/task-execute": 1.0,
+    "/yt-summary": 5.0,
+}
+DEFAULT_PLAN = "free"
+ANONYMOUS_PLAN = "anonymous"
+
+Authenticator = Callable[[str], Awaitable[Optional[dict]]]
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class AdmissionController:
+    """Per-user token buckets plus a global concurrency ceiling with a wait queue"""
+
+    def __init__(self, roles: RoleCache = role_cache, plan_rates: Dict[str, float] = ADMISSION_PLAN_RATES,
+                 max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                 burst_seconds: float = ADMISSION_BURST_SECONDS, max_buckets: int = ADMISSION_MAX_BUCKETS):
+        self.roles = roles
+        self.plan_rates = plan_rates
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.burst_seconds = burst_seconds
+        self.max_buckets = max_buckets
+        self.authenticate: Optional[Authenticator] = None
+        self._buckets: OrderedDict = OrderedDict()  # (caller, endpoint) -> TokenBucket
+        self._waiters: deque = deque()
+        self.in_flight = 0
+        self._service_time = 1.0  # moving average of admitted request duration, seconds
+        self.counters = {"admitted": 0, "queued": 0, "rate_limited": 0, "queue_full": 0, "queue_timeouts": 0}
+
+    def set_authenticator(self, authenticate: Authenticator):
+        """Resolve a verified user from the Authorization header (returns {"uid": ...} or None)"""
+        self.authenticate = authenticate
+
+    def rate(self, plan: Optional[str]) -> float:
+        """Tokens per second for a plan; unknown plans get the default plan's rate"""
+        per_minute = self.plan_rates.get(plan or ANONYMOUS_PLAN)
+        if per_minute is None:
+            per_minute = self.plan_rates.get(DEFAULT_PLAN, 30.0)
+        return per_minute / 60
+
+    def take(self, caller: str, endpoint: str, plan: Optional[str], cost: float,
+             now: Optional[float] = None) -> Optional[float]:
+        """Spend cost tokens; returns None if admitted, else seconds until they would be available"""
+        now = time.monotonic() if now is None else now
+        rate = self.rate(plan)
+        capacity = max(cost, rate * self.burst_seconds)
+        key = (caller, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(capacity, now)
+            while len(self._buckets) > self.max_buckets:
+                # Forgetting an idle caller only hands them a full bucket again
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return None
+        return (cost - bucket.tokens) / rate if rate > 0 else 60.0
+
+    def refund(self, caller: str, endpoint: str, cost: float):
+        bucket = self._buckets.get((caller, endpoint))
+        if bucket is not None:
+            bucket.tokens += cost
+
+    def _estimated_wait(self) -> float:
+        return self._service_time * (len(self._waiters) + 1) / self.max_concurrent
+
+    async def acquire(self):
+        """Take a concurrency slot, queueing FIFO behind earlier requests"""
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.counters["queue_full"] += 1
+            raise AdmissionRejected("Server busy, try again shortly", self._estimated_wait())
+
+        self.counters["queued"] += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the wait ran out: keep it
+                return
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            self.counters["queue_timeouts"] += 1
+            raise AdmissionRejected("Server busy, try again shortly", self._estimated_wait())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, duration: Optional[float] = None):
+        if duration is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * duration
+        # Hand the slot straight to the oldest waiter so in_flight never dips
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def admit(self, user_id: Optional[str], client: str, endpoint: str) -> dict:
+        """Apply the caller's rate limit, then wait for a concurrency slot
+
+        user_id must come from a verified token: it selects whose bucket is charged.
+        Returns the charge ({caller, plan, endpoint, cost}) for reroute.
+        """
+        cost = ENDPOINT_COSTS[endpoint]
+        plan = await self.roles.get_plan(user_id) if user_id else None
+        # Verified but unregistered users share their IP's bucket, so minting accounts buys nothing
+        caller = f"user:{user_id}" if plan else f"ip:{client}"
+        plan = plan or ANONYMOUS_PLAN
+        retry_after = self.take(caller, endpoint, plan, cost)
+        if retry_after is not None:
+            self.counters["rate_limited"] += 1
+            raise AdmissionRejected(f"Rate limit exceeded for {endpoint} on the {plan} plan", retry_after)
+        try:
+            await self.acquire()
+        except AdmissionRejected:
+            # Turned away for load, not for this caller's usage
+            self.refund(caller, endpoint, cost)
+            raise
+        self.counters["admitted"] += 1
+        return {"caller": caller, "plan": plan, "endpoint": endpoint, "cost": cost}
+
+    def reroute(self, charge: dict, endpoint: str):
+        """Move an admitted request's charge to the endpoint whose work it will do, at that cost"""
+        if endpoint == charge["endpoint"]:
+            return
+        cost = ENDPOINT_COSTS[endpoint]
+        retry_after = self.take(charge["caller"], endpoint, charge["plan"], cost)
+        if retry_after is not None:
+            self.counters["rate_limited"] += 1
+            raise AdmissionRejected(f"Rate limit exceeded for {endpoint} on the {charge['plan']} plan", retry_after)
+        self.refund(charge["caller"], charge["endpoint"], charge["cost"])
+        charge.update(endpoint=endpoint, cost=cost)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "buckets": len(self._buckets),
+            "avg_service_ms": round(self._service_time * 1000, 1),
+        }
+
+
+def client_address(scope, trusted_proxies=ADMISSION_TRUSTED_PROXIES) -> str:
+    """Client IP, read from X-Forwarded-For only when the peer is a trusted proxy"""
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if address not in trusted_proxies:
+        return address
+    forwarded = dict(scope["headers"]).get(b"x-forwarded-for", b"").decode(errors="replace")
+    # Rightmost hop not added by one of our own proxies; anything left of it is client-supplied
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        if hop not in trusted_proxies:
+            return hop
+    return address
+
+
+def routed(scope) -> bool:
+    """Whether a route accepts this path and method, so 404s and 405s are not charged"""
+    app = scope.get("app")
+    return any(route.matches(scope)[0] == Match.FULL for route in getattr(app, "routes", ()))
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to ENDPOINT_COSTS paths"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def identify(self, scope) -> Optional[str]:
+        """Verified uid from the Authorization header; a user_id field proves nothing"""
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode(errors="replace")
+        if not authorization or self.controller.authenticate is None:
+            return None
+        user = await self.controller.authenticate(authorization)
+        return user["uid"] if user else None
+
+    async def __call__(self, scope, receive, send):
+        endpoint = scope.get("path") if scope["type"] == "http" else None
+        if endpoint not in ENDPOINT_COSTS or not routed(scope):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = await self.identify(scope)
+        try:
+            charge = await self.controller.admit(user_id, client_address(scope), endpoint)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": e.detail, "retry_after": e.retry_after},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Handlers read it as request.state.admission to reroute the charge
+        scope.setdefault("state", {})["admission"] = charge
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - start)
+
+
+admission_control = AdmissionController()
@@ -0,0 +1,172 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+import jwt
+from cryptography.x509 import load_pem_x509_certificate
+
+# Firebase ID token verification with caching.
+# Google's signing certificates are fetched once and kept for the lifetime
+# their Cache-Control header allows; decoded tokens are cached by SHA-256 of
+# the token until their own exp claim, so a client reusing its token costs a
+# dictionary lookup instead of an RSA signature check.
+
+FIREBASE_CERTS_URL = os.getenv(
+    "FIREBASE_CERTS_URL",
+    "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com",
+)
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "")
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Used when the key server sends no max-age, and as the floor between refetches for unknown key ids
+SIGNING_KEYS_DEFAULT_TTL_SECONDS = float(os.getenv("SIGNING_KEYS_DEFAULT_TTL_SECONDS", "3600"))
+SIGNING_KEYS_MIN_REFRESH_SECONDS = float(os.getenv("SIGNING_KEYS_MIN_REFRESH_SECONDS", "30"))
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+CLOCK_SKEW_SECONDS = 5
+
+
+class TokenVerificationError(Exception):
+    """Raised for tokens that are malformed, expired, or not signed by a current key"""
+
+
+class SigningKeyCache:
+    """Public keys by key id, refreshed when the HTTP cache lifetime runs out"""
+
+    def __init__(self, url: str = FIREBASE_CERTS_URL, client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self._client = client
+        self._keys: Dict[str, object] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.fetches = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0))
+        return self._client
+
+    async def _refresh(self):
+        response = await self.client.get(self.url)
+        response.raise_for_status()
+        self._keys = {
+            kid: load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in response.json().items()
+        }
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        ttl = int(match.group(1)) if match else SIGNING_KEYS_DEFAULT_TTL_SECONDS
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + ttl
+        self.fetches += 1
+
+    async def get(self, kid: str):
+        now = time.monotonic()
+        if now < self._expires_at and kid in self._keys:
+            return self._keys[kid]
+
+        async with self._lock:
+            # Another request may have refreshed while we waited; unknown key ids
+            # (rotation) trigger a refetch, but not more often than the minimum interval
+            now = time.monotonic()
+            stale = now >= self._expires_at
+            unknown = kid not in self._keys and now - self._fetched_at >= SIGNING_KEYS_MIN_REFRESH_SECONDS
+            if stale or unknown:
+                await self._refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise TokenVerificationError(f"Unknown signing key id: {kid}")
+        return key
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class TokenVerifier:
+    """Verifies Firebase ID tokens and remembers the decoded claims until they expire"""
+
+    def __init__(self, project_id: str = FIREBASE_PROJECT_ID, keys: Optional[SigningKeyCache] = None,
+                 max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.project_id = project_id
+        self.keys = keys or SigningKeyCache()
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # sha256(token) -> decoded claims
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "rejected": 0}
+
+    async def verify(self, token: str) -> dict:
+        """Decoded claims of a valid token, with "uid" set from the subject"""
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        claims = self._entries.get(digest)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                self._entries.move_to_end(digest)
+                self.counters["hits"] += 1
+                return claims
+            del self._entries[digest]
+            self.counters["expired"] += 1
+            raise TokenVerificationError("Token has expired")
+
+        self.counters["misses"] += 1
+        try:
+            claims = await self._decode(token)
+        except TokenVerificationError:
+            self.counters["rejected"] += 1
+            raise
+        except jwt.PyJWTError as e:
+            self.counters["rejected"] += 1
+            raise TokenVerificationError(str(e))
+
+        self._entries[digest] = claims
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return claims
+
+    async def _decode(self, token: str) -> dict:
+        # Same checks as firebase_admin.auth.verify_id_token
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") != "RS256" or not header.get("kid"):
+            raise TokenVerificationError("Token must be RS256-signed with a key id")
+        if not self.project_id:
+            raise TokenVerificationError("FIREBASE_PROJECT_ID is not configured")
+
+        claims = jwt.decode(
+            token,
+            await self.keys.get(header["kid"]),
+            algorithms=["RS256"],
+            audience=self.project_id,
+            issuer=f"https://securetoken.google.com/{self.project_id}",
+            leeway=CLOCK_SKEW_SECONDS,
+            options={"require": ["exp", "iat", "sub"]},
+        )
+        subject = claims["sub"]
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise TokenVerificationError("Token has an invalid subject")
+        claims["uid"] = subject
+        return claims
+
+    def invalidate(self, token: Optional[str] = None):
+        """Drop one token (e.g. on sign-out) or every cached token"""
+        if token is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(hashlib.sha256(token.encode()).hexdigest(), None)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "key_fetches": self.keys.fetches,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_verifier = TokenVerifier()
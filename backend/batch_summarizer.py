@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from typing import List, Optional
+
+from llm_client import llm
+
+# Batch summarization engine.
+# Packs several items into one structured prompt so N summaries cost one LLM
+# round-trip; items the model drops or mangles fall back to a single-item call.
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "3000"))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "10"))
+
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful assistant that summarizes several items at once. "
+    "Reply with JSON only, matching this schema: "
+    '{"summaries": [{"id": <integer item id>, "summary": "<text>"}]}. '
+    "Return exactly one entry per item id."
+)
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def plan_batches(items: List[str], item_max_tokens: int,
+                 token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+                 max_items: int = LLM_BATCH_MAX_ITEMS) -> List[List[int]]:
+    """Greedily group item indices so each batch's prompt + output fits the budget"""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = estimate_tokens(BATCH_SYSTEM_PROMPT)
+    for index, item in enumerate(items):
+        cost = estimate_tokens(item) + item_max_tokens + 10
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            used = estimate_tokens(BATCH_SYSTEM_PROMPT)
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(content: str, expected_ids: List[int]) -> dict:
+    """Parse {"summaries": [{"id", "summary"}]} and keep only well-formed expected entries"""
+    match = _JSON_OBJECT.search(content or "")
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    entries = data.get("summaries") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return {}
+
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        item_id, summary = entry.get("id"), entry.get("summary")
+        if isinstance(item_id, str) and item_id.isdigit():
+            item_id = int(item_id)
+        if isinstance(item_id, int) and item_id in expected_ids and isinstance(summary, str) and summary.strip():
+            parsed[item_id] = summary.strip()
+    return parsed
+
+
+async def summarize_one(item: str, instruction: str, item_max_tokens: int,
+                        system_prompt: str, model: str, use_cache: bool = True) -> Optional[str]:
+    try:
+        response = await llm.chat(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"{instruction} {item}"}
+            ],
+            max_tokens=item_max_tokens,
+            use_cache=use_cache
+        )
+        return response.content
+    except Exception as e:
+        logger.warning("Single-item summary failed: %s", e)
+        return None
+
+
+async def summarize_batch(items: List[str], ids: List[int], instruction: str,
+                          item_max_tokens: int, system_prompt: str, model: str,
+                          use_cache: bool = True) -> dict:
+    """Summarize one batch in a single call, retrying unparsed items individually"""
+    if len(ids) == 1:
+        return {ids[0]: await summarize_one(items[ids[0]], instruction, item_max_tokens, system_prompt, model, use_cache)}
+
+    listing = "\n\n".join(f"Item {i}:\n{items[i]}" for i in ids)
+    parsed = {}
+    try:
+        response = await llm.chat(
+            model=model,
+            messages=[
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": f"{instruction}\n\n{listing}"}
+            ],
+            max_tokens=item_max_tokens * len(ids) + 20 * len(ids),
+            use_cache=use_cache
+        )
+        parsed = parse_batch_response(response.content, ids)
+    except Exception as e:
+        logger.warning("Batch summary failed, falling back per item: %s", e)
+
+    missing = [i for i in ids if i not in parsed]
+    if missing:
+        fallbacks = await asyncio.gather(*(
+            summarize_one(items[i], instruction, item_max_tokens, system_prompt, model, use_cache)
+            for i in missing
+        ))
+        parsed.update(zip(missing, fallbacks))
+    return parsed
+
+
+async def summarize_items(items: List[str], instruction: str, item_max_tokens: int = 150,
+                          system_prompt: str = "You are a helpful assistant that summarizes content concisely.",
+                          model: str = "gpt-4o-mini",
+                          token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+                          use_cache: bool = True) -> List[Optional[str]]:
+    """Summarize items with as few LLM round-trips as the token budget allows
+
+    Returns one summary per input item, or None where every attempt failed.
+    """
+    if not items:
+        return []
+    batches = plan_batches(items, item_max_tokens, token_budget)
+    results = await asyncio.gather(*(
+        summarize_batch(items, ids, instruction, item_max_tokens, system_prompt, model, use_cache)
+        for ids in batches
+    ))
+    merged = {}
+    for result in results:
+        merged.update(result)
+    return [merged.get(i) for i in range(len(items))]
@@ -0,0 +1,119 @@
+"""Measure Firebase ID token verification with and without the token cache.
+
+Usage (from backend/):
+    python benchmarks/bench_auth_cache.py --tokens 50 --requests 20000
+
+A locally generated RSA key signs Firebase-shaped tokens, and a stand-in key
+server on localhost publishes its certificate with a Cache-Control max-age,
+so no Google endpoint or service account is involved.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_cache import SigningKeyCache, TokenVerifier  # noqa: E402
+
+PROJECT_ID = "astramind-bench"
+KEY_ID = "bench-key"
+
+
+def generate_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "bench")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+def serve_keys(cert_pem: str, max_age: int) -> tuple:
+    requests = []
+
+    class KeyServer(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(time.time())
+            body = json.dumps({KEY_ID: cert_pem}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", f"public, max-age={max_age}, must-revalidate")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeyServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/certs", requests
+
+
+def mint(key, uid: str) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+            "aud": PROJECT_ID,
+            "sub": uid,
+            "iat": now,
+            "exp": now + 3600,
+            "email": f"{uid}@example.com",
+        },
+        key,
+        algorithm="RS256",
+        headers={"kid": KEY_ID},
+    )
+
+
+async def run(verifier: TokenVerifier, tokens, requests: int, cached: bool) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        if not cached:
+            verifier.invalidate()
+        claims = await verifier.verify(tokens[i % len(tokens)])
+        assert claims["uid"].startswith("user-")
+    return requests / (time.perf_counter() - start)
+
+
+async def bench(tokens: int, requests: int):
+    key, cert_pem = generate_key()
+    url, key_requests = serve_keys(cert_pem, max_age=3600)
+    minted = [mint(key, f"user-{i}") for i in range(tokens)]
+
+    for cached in (False, True):
+        verifier = TokenVerifier(PROJECT_ID, SigningKeyCache(url))
+        rate = await run(verifier, minted, requests, cached)
+        label = "token cache" if cached else "verify every call"
+        print(f"{label:>18}: {rate:10.0f} verifications/s  {verifier.stats()}")
+        await verifier.keys.aclose()
+    print(f"key server requests: {len(key_requests)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.tokens, args.requests))
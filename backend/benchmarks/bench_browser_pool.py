@@ -0,0 +1,113 @@
+"""Compare the warm browser pool with launching Chromium per request.
+
+Usage (from backend/, needs `playwright install chromium`):
+    python benchmarks/bench_browser_pool.py --requests 40 --concurrency 8
+
+A static job board is served from a temporary directory on localhost, and
+job-search automations run against it through /browser-automation, once with
+the pool and once with a fresh browser launched for every request.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from browser_pool import BrowserPool  # noqa: E402
+
+JOB_CARD = """
+<div class="job">
+  <h2 class="title">Engineer {i}</h2><span class="company">Company {i}</span>
+  <span class="location">Remote</span><span class="salary">${i}0,000</span>
+  <a href="/apply/{i}">Apply</a>
+</div>
+"""
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_static_site() -> str:
+    root = tempfile.mkdtemp()
+    with open(os.path.join(root, "jobs.html"), "w") as page:
+        page.write("<html><body>" + "".join(JOB_CARD.format(i=i) for i in range(25)) + "</body></html>")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/jobs.html"
+
+
+class LaunchPerRequestPool(BrowserPool):
+    """The pre-pool behaviour: every job launches and closes its own browser"""
+
+    async def _checkout(self):
+        pooled = await self._launch()
+        pooled.active += 1
+        self.counters["uses"] += 1
+        return pooled
+
+    async def _checkin(self, pooled):
+        await self._close(pooled)
+
+
+async def run(pool: BrowserPool, url: str, requests: int, concurrency: int):
+    main.browser_pool = pool
+    await pool.start()
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/browser-automation",
+                                             data={"task_type": "job-search", "target_url": url})
+                response.raise_for_status()
+                assert response.json()["metadata"]["total_jobs_found"] == 25
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    await pool.stop()
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "launches": pool.counters["launches"],
+    }
+
+
+async def bench(requests: int, concurrency: int):
+    await main.init_db()
+    url = serve_static_site()
+    for name, pool in (
+        ("launch per request", LaunchPerRequestPool(size=0, max_contexts=concurrency)),
+        ("warm pool", BrowserPool(max_contexts=concurrency)),
+    ):
+        result = await run(pool, url, requests, concurrency)
+        print(f"{name:>20}: {result['rps']:6.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p95 {result['p95_ms']:7.1f} ms  browser launches {result['launches']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.concurrency))
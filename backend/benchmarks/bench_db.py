@@ -0,0 +1,138 @@
+"""Benchmark /reminders and /user-activity throughput before and after the pooled DB layer.
+
+Usage (from backend/):
+    python benchmarks/bench_db.py --requests 2000 --concurrency 50
+
+"before" replays the old handlers that open a fresh sqlite3 connection inside
+the async handler; "after" drives the real app in main.py.
+"""
+import os
+import sys
+import time
+import json
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="astramind-bench-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(BENCH_DIR, "after.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI, Form
+
+import main
+from db import db
+from migrations import migrate
+
+LEGACY_DB = os.path.join(BENCH_DIR, "before.db")
+
+
+def build_legacy_app() -> FastAPI:
+    """Recreate the per-call sqlite3.connect handlers for comparison"""
+    legacy = FastAPI()
+
+    @legacy.get("/reminders")
+    async def get_reminders():
+        conn = sqlite3.connect(LEGACY_DB)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, task, reminder_time, status, created_at
+            FROM reminders
+            WHERE status = 'pending'
+            ORDER BY reminder_time ASC
+        ''')
+        reminders = [
+            {"id": r[0], "task": r[1], "reminder_time": r[2], "status": r[3], "created_at": r[4]}
+            for r in cursor.fetchall()
+        ]
+        conn.close()
+        return {"reminders": reminders}
+
+    @legacy.post("/user-activity")
+    async def log_user_activity(
+        user_id: str = Form(...),
+        task_type: str = Form(...),
+        status: str = Form(...),
+        command: str = Form(None),
+        details: str = Form("{}")
+    ):
+        conn = sqlite3.connect(LEGACY_DB)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO task_history (user_id, task_type, command, status, details)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, task_type, command, status, details))
+        cursor.execute('UPDATE user_profiles SET task_count = task_count + 1 WHERE uid = ?', (user_id,))
+        conn.commit()
+        conn.close()
+        return {"message": "Activity logged successfully"}
+
+    return legacy
+
+
+def seed(conn: sqlite3.Connection, reminders: int):
+    migrate(conn)
+    conn.execute(
+        "INSERT OR IGNORE INTO user_profiles (uid, email, display_name) VALUES (?, ?, ?)",
+        ("bench-user", "bench@astramind.com", "Bench User"),
+    )
+    conn.executemany(
+        "INSERT INTO reminders (task, reminder_time, status) VALUES (?, ?, 'pending')",
+        [(f"task {i}", f"2030-01-01T{i % 24:02d}:00:00") for i in range(reminders)],
+    )
+    conn.commit()
+
+
+async def run_load(app, method: str, path: str, total: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    form = {
+        "user_id": "bench-user",
+        "task_type": "benchmark",
+        "status": "completed",
+        "command": "bench",
+        "details": json.dumps({"source": "bench_db"}),
+    }
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                if method == "GET":
+                    response = await client.get(path)
+                else:
+                    response = await client.post(path, data=form)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed
+
+
+async def bench(total: int, concurrency: int, reminders: int):
+    legacy_conn = sqlite3.connect(LEGACY_DB)
+    seed(legacy_conn, reminders)
+    legacy_conn.close()
+
+    await main.init_db()
+    await db.run(seed, reminders)
+
+    legacy = build_legacy_app()
+    print(f"{'endpoint':<20}{'before req/s':>15}{'after req/s':>15}")
+    for method, path in (("GET", "/reminders"), ("POST", "/user-activity")):
+        before = await run_load(legacy, method, path, total, concurrency)
+        after = await run_load(main.app, method, path, total, concurrency)
+        print(f"{path:<20}{before:>15.1f}{after:>15.1f}")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--reminders", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.concurrency, args.reminders))
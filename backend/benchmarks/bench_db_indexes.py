@@ -0,0 +1,100 @@
+"""Show hot-path query latency with and without the migration indexes as tables grow.
+
+Usage (from backend/):
+    python benchmarks/bench_db_indexes.py --sizes 10000,100000,1000000
+
+For every size, task_history and reminders are seeded with that many rows
+(spread over 1,000 users, with about 500 reminders still pending) in two
+databases: one at schema version 1 (no secondary indexes) and one fully
+migrated. The /user-tasks and /reminders queries are then timed against both.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import initial_schema, migrate  # noqa: E402
+
+USERS = 1000
+PENDING_REMINDERS = 500
+BATCH = 50000
+
+QUERIES = {
+    "/user-tasks": (
+        "SELECT id, task_type, command, status, details, timestamp FROM task_history "
+        "WHERE user_id = ? ORDER BY timestamp DESC, id DESC LIMIT 50"
+    ),
+    "/reminders": (
+        "SELECT id, task, reminder_time, status, created_at FROM reminders "
+        "WHERE status = 'pending' ORDER BY reminder_time ASC, id ASC LIMIT 100"
+    ),
+}
+
+
+def seed(conn: sqlite3.Connection, rows: int):
+    rng = random.Random(42)
+    pending_ratio = min(1.0, PENDING_REMINDERS / rows)
+    for offset in range(0, rows, BATCH):
+        count = min(BATCH, rows - offset)
+        conn.executemany(
+            "INSERT INTO task_history (user_id, task_type, command, status, details, timestamp) "
+            "VALUES (?, 'llm-processing', 'bench', 'completed', '{}', ?)",
+            ((f"user-{rng.randrange(USERS)}", f"2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T"
+              f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:00") for _ in range(count)),
+        )
+        conn.executemany(
+            "INSERT INTO reminders (task, reminder_time, status) VALUES ('bench', ?, ?)",
+            ((f"2030-01-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:00:00",
+              "pending" if rng.random() < pending_ratio else "completed") for _ in range(count)),
+        )
+    conn.commit()
+
+
+def build(rows: int, indexed: bool) -> sqlite3.Connection:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    if indexed:
+        migrate(conn)
+    else:
+        initial_schema(conn)
+    conn.commit()
+    seed(conn, rows)
+    return conn
+
+
+def time_query(conn: sqlite3.Connection, sql: str, repeat: int) -> float:
+    rng = random.Random(7)
+    samples = []
+    for _ in range(repeat):
+        params = (f"user-{rng.randrange(USERS)}",) if "?" in sql else ()
+        start = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(sizes, repeat: int):
+    print(f"{'rows':>10}  {'query':<12}{'no index ms':>14}{'indexed ms':>14}")
+    for rows in sizes:
+        plain, indexed = build(rows, indexed=False), build(rows, indexed=True)
+        for name, sql in QUERIES.items():
+            print(f"{rows:>10}  {name:<12}{time_query(plain, sql, repeat):>14.3f}"
+                  f"{time_query(indexed, sql, repeat):>14.3f}")
+        plain.close()
+        indexed.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.repeat)
@@ -0,0 +1,131 @@
+"""Measure local intent routing for /task-execute: latency, accuracy and LLM avoidance.
+
+Usage (from backend/):
+    python benchmarks/bench_intent_router.py --repeat 2000
+
+Every command in CORPUS is labelled with the intent it should route to (None
+means it genuinely needs the LLM); TASKS pins the reminder task a command must
+extract, so a connector swallowing part of the day word shows up. The report compares the compiled router with
+the previous substring chain, which only recognised reminders and messages and
+sent everything else to the LLM.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import route  # noqa: E402
+
+CORPUS = [
+    ("Remind me to call mom at 6pm", "reminder"),
+    ("remind me in 20 minutes to check the oven", "reminder"),
+    ("Set a reminder for the dentist appointment tomorrow at 9:30", "reminder"),
+    ("please remind me to take my medicine tonight", "reminder"),
+    ("Hey Astra, remind me about the team standup at 10am", "reminder"),
+    ("create a reminder to pay the electricity bill", "reminder"),
+    ("Set an alarm for 7am tomorrow", "reminder"),
+    ("remind me to water the plants in 2 hours", "reminder"),
+    ("Can you remind me to submit the report this afternoon", "reminder"),
+    ("add reminder: renew passport", "reminder"),
+    ("Remind me that the gym closes at 9pm", "reminder"),
+    ("remind me to buy milk", "reminder"),
+    ("remind me tomorrow to buy milk", "reminder"),
+    ("remind me tomorrow at 9 to submit the report", "reminder"),
+    ("remind me tonight to take pills", "reminder"),
+    ("remind me forty minutes later", "reminder"),
+    ("Send a message to John saying I'll be late", "message"),
+    ("send a message to mom that dinner is ready", "message"),
+    ("Send a WhatsApp message to Priya: meeting moved to 4", "message"),
+    ("text Alex saying running 10 minutes behind", "message"),
+    ("whatsapp to Rahul happy birthday", "message"),
+    ("send a text to dad", "message"),
+    ("Send message to the team on whatsapp saying build is green", "message"),
+    ("please send an sms to Sarah that I reached home", "message"),
+    ("message Ravi Kumar saying call me back", "message"),
+    ("Find software engineer jobs in Bangalore", "job_search"),
+    ("search for data scientist jobs in Pune", "job_search"),
+    ("show me product manager openings in London", "job_search"),
+    ("find jobs for a frontend developer in Berlin", "job_search"),
+    ("look for remote python developer positions", "job_search"),
+    ("Find me some nursing jobs near Chicago", "job_search"),
+    ("get machine learning engineer jobs", "job_search"),
+    ("search for jobs as a graphic designer in Mumbai", "job_search"),
+    ("Summarize YouTube videos about quantum computing", "youtube_summary"),
+    ("summarise the top videos on machine learning", "youtube_summary"),
+    ("give me a summary of youtube videos on meditation", "youtube_summary"),
+    ("summarize videos about climate change", "youtube_summary"),
+    ("Summarize YouTube about the history of Rome", "youtube_summary"),
+    ("what do youtube videos say about intermittent fasting", "youtube_summary"),
+    ("What's the weather like today?", None),
+    ("Tell me a joke", None),
+    ("How do I reset my router?", None),
+    ("Explain the theory of relativity in simple terms", None),
+    ("What is the capital of Australia", None),
+    ("Translate good morning into Hindi", None),
+    ("I saw a great video yesterday", None),
+    ("Do you remember what I said about the message earlier?", None),
+    ("write a poem about the ocean", None),
+    ("what time is it in Tokyo", None),
+    ("text summarization techniques explained", None),
+    ("sms gateway pricing in india", None),
+    ("whatsapp vs telegram comparison", None),
+    ("message", None),
+    ("message mom that dinner is ready", None),
+]
+
+TASKS = {
+    "remind me tomorrow to buy milk": "buy milk",
+    "remind me tomorrow at 9 to submit the report": "submit the report",
+    "remind me tonight to take pills": "take pills",
+    "remind me forty minutes later": "forty minutes later",
+}
+
+
+def legacy_route(command: str):
+    lowered = command.lower()
+    if "reminder" in lowered or "remind" in lowered:
+        return "reminder"
+    if "whatsapp" in lowered or "message" in lowered:
+        return "message"
+    return None
+
+
+def main(repeat: int, verbose: bool):
+    correct = local = legacy_correct = legacy_local = 0
+    for command, expected in CORPUS:
+        routed = route(command)
+        intent = routed.intent if routed.local else None
+        if command in TASKS and routed.slots.get("task") != TASKS[command]:
+            intent = f"{intent} (task {routed.slots.get('task')!r})"
+        correct += intent == expected
+        local += intent is not None
+        legacy = legacy_route(command)
+        legacy_correct += legacy == expected
+        legacy_local += legacy is not None
+        if verbose or intent != expected:
+            marker = "  " if intent == expected else "! "
+            print(f"{marker}{command!r:70} -> {intent} ({routed.confidence}) {routed.slots}")
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for command, _ in CORPUS:
+            route(command)
+        samples.append((time.perf_counter() - start) / len(CORPUS))
+
+    total = len(CORPUS)
+    print(f"commands: {total}")
+    print(f"router:  accuracy {correct / total:.0%}, handled locally {local / total:.0%}, "
+          f"median {statistics.median(samples) * 1e6:.1f} us/command")
+    print(f"legacy:  accuracy {legacy_correct / total:.0%}, handled locally {legacy_local / total:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    main(args.repeat, args.verbose)
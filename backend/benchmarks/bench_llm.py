@@ -0,0 +1,77 @@
+"""Load-test /llm-process and /task-execute offline against the stub LLM provider.
+
+Usage (from backend/):
+    python benchmarks/bench_llm.py --requests 500 --concurrency 100 --latency-ms 200
+
+With the async client, throughput should approach concurrency / latency
+(bounded by LLM_MAX_CONCURRENCY) instead of 1 / latency.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="astramind-bench-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(BENCH_DIR, "bench.db"))
+os.environ["LLM_ENABLE_STUB"] = "true"
+# Every request comes from one anonymous client: lift its rate limit so the
+# benchmark measures the LLM path, not admission control
+os.environ.setdefault("ADMISSION_PLAN_RATES", "anonymous:1000000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_load(app, path: str, form: dict, total: int, concurrency: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, data=form)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, latencies
+
+
+async def bench(total: int, concurrency: int, latency_ms: float):
+    os.environ["LLM_STUB_LATENCY_MS"] = str(latency_ms)
+    import main
+    from db import db
+
+    await main.init_db()
+    cases = (
+        ("/llm-process", {"text": "Plan my day", "provider": "stub", "no_cache": "true"}),
+        ("/task-execute", {"command": "what should I cook tonight", "provider": "stub", "no_cache": "true"}),
+    )
+    print(f"{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for path, form in cases:
+        rps, latencies = await run_load(main.app, path, form, total, concurrency)
+        print(f"{path:<16}{rps:>10.1f}{percentile(latencies, 50) * 1000:>10.1f}"
+              f"{percentile(latencies, 95) * 1000:>10.1f}")
+
+    await main.llm.aclose()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    args = parser.parse_args()
+    asyncio.run(bench(args.requests, args.concurrency, args.latency_ms))
@@ -0,0 +1,157 @@
+"""Exercise latency-aware provider routing against local stub LLM servers.
+
+Usage (from backend/):
+    python benchmarks/bench_provider_router.py --requests 600 --concurrency 20
+
+Two OpenAI-compatible stub servers run on localhost with injected latency and
+errors. Scenarios:
+  tail    alpha answers in ~150 ms but 8% of calls take 1.5 s, beta a steady ~250 ms
+  outage  alpha returns 503 for the middle third of the run, beta stays healthy
+Each scenario is run pinned to alpha (what provider=openai does today), through
+the router without hedging, and through the router with hedging.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import asyncio
+import argparse
+
+os.environ.setdefault("LLM_BREAKER_COOLDOWN_SECONDS", "2")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, Response, StreamingResponse  # noqa: E402
+from starlette.requests import ClientDisconnect  # noqa: E402
+
+from llm_client import LLMClient, LLMError, OpenAIProvider  # noqa: E402
+from provider_router import ProviderRouter, percentile  # noqa: E402
+
+
+def stub_app(profile: dict) -> FastAPI:
+    """OpenAI-compatible chat completions with latency and errors from profile"""
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # A hedged call that lost the race before its body was read
+            return Response(status_code=499)
+        if random.random() < profile["error_rate"]:
+            return JSONResponse({"error": {"message": "injected failure"}}, status_code=503)
+        slow = random.random() < profile["tail_fraction"]
+        delay = profile["tail_ms"] if slow else profile["latency_ms"] * random.uniform(0.8, 1.2)
+        await asyncio.sleep(delay / 1000)
+        content = f"{profile['name']} answer"
+        if body.get("stream"):
+            async def events():
+                for word in content.split(" "):
+                    yield f'data: {{"choices": [{{"delta": {{"content": "{word} "}}}}]}}\n\n'
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return {
+            "model": body["model"],
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+        }
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_server(profile: dict):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(stub_app(profile), port=port, log_level="error"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{port}/v1"
+
+
+async def run(call, total: int, concurrency: int, on_progress=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    done = 0
+
+    async def one():
+        nonlocal failures, done
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except LLMError:
+                failures += 1
+            done += 1
+            if on_progress:
+                on_progress(done / total)
+
+    await asyncio.gather(*(one() for _ in range(total)))
+    return latencies, failures
+
+
+def report(label: str, latencies, failures: int, total: int, router=None):
+    line = f"{label:<22}{(total - failures) / total:>8.1%}"
+    if latencies:
+        line += "".join(f"{percentile(latencies, pct) * 1000:>9.0f}" for pct in (50, 95, 99))
+    if router is not None:
+        providers = {name: health.stats()["calls"] for name, health in router.health.items()}
+        line += f"   hedged {router.counters['hedged']}, hedge wins {router.counters['hedge_wins']}, " \
+                f"failovers {router.counters['failovers']}, calls {providers}"
+    print(line)
+
+
+async def main(total: int, concurrency: int):
+    alpha = {"name": "alpha", "latency_ms": 150, "tail_ms": 1500, "tail_fraction": 0.08, "error_rate": 0.0}
+    beta = {"name": "beta", "latency_ms": 250, "tail_ms": 250, "tail_fraction": 0.0, "error_rate": 0.0}
+    servers = [await start_server(alpha), await start_server(beta)]
+
+    client = LLMClient(cache=None)
+    client.register(OpenAIProvider(base_url=servers[0][2], api_key="bench", name="alpha"))
+    client.register(OpenAIProvider(base_url=servers[1][2], api_key="bench", name="beta"))
+    messages = [{"role": "user", "content": "Plan my day"}]
+
+    def outage(fraction: float):
+        alpha["error_rate"] = 1.0 if 1 / 3 <= fraction < 2 / 3 else 0.0
+
+    try:
+        for scenario in ("tail", "outage"):
+            print(f"\n{scenario}: {total} requests, concurrency {concurrency}")
+            print(f"{'mode':<22}{'success':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+            if scenario == "outage":
+                alpha["tail_fraction"] = 0.0
+            on_progress = outage if scenario == "outage" else None
+
+            latencies, failures = await run(
+                lambda: client.chat(messages, provider="alpha", use_cache=False), total, concurrency, on_progress
+            )
+            report("pinned alpha", latencies, failures, total)
+            for hedge in (False, True):
+                router = ProviderRouter(client, ["alpha", "beta"], hedge=hedge)
+                latencies, failures = await run(
+                    lambda: router.chat(messages, use_cache=False), total, concurrency, on_progress
+                )
+                report("router, hedged" if hedge else "router, no hedging", latencies, failures, total, router)
+            alpha["error_rate"] = 0.0
+    finally:
+        await client.aclose()
+        for server, task, _ in servers:
+            server.should_exit = True
+            await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
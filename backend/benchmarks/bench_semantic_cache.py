@@ -0,0 +1,121 @@
+"""Measure the semantic interpretation cache: paraphrase hit rate, false hits and lookup latency.
+
+Usage (from backend/):
+    python benchmarks/bench_semantic_cache.py --entries 5000 --lookups 2000
+
+PAIRS holds (cached command, later command, should_hit): rephrasings of the
+same request should reuse the cached interpretation, different requests that
+merely share words must not. The report sweeps thresholds over these pairs,
+then times lookups against an index filled with --entries distinct commands.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache, embed, signature, SEMANTIC_CACHE_THRESHOLD  # noqa: E402
+
+PAIRS = [
+    ("What's the weather like today?", "what is the weather like today", True),
+    ("Tell me a joke", "tell me a joke please", True),
+    ("How do I reset my router?", "how can I reset my router", True),
+    ("Explain the theory of relativity in simple terms", "explain the theory of relativity simply", True),
+    ("What is the capital of Australia", "whats the capital of australia?", True),
+    ("Translate good morning into Hindi", "translate 'good morning' to hindi", True),
+    ("write a poem about the ocean", "Write me a poem about the ocean", True),
+    ("what time is it in Tokyo", "what's the time in Tokyo right now", True),
+    ("Hey Astra, how do I make pancakes", "how do i make pancakes", True),
+    ("give me tips for better sleep", "could you give me some tips for better sleep", True),
+    ("remind me to call mom", "reminder call mom", True),
+    ("remind me to water the plants", "reminder to water plants", True),
+    ("What's the weather like today?", "What's the weather like in Paris tomorrow?", False),
+    ("Tell me a joke", "tell me a fun fact", False),
+    ("How do I reset my router?", "how do I reset my password", False),
+    ("What is the capital of Australia", "what is the capital of Austria", False),
+    ("Translate good morning into Hindi", "translate good night into Spanish", False),
+    ("write a poem about the ocean", "write a story about the forest", False),
+    ("what time is it in Tokyo", "what time is it in London", False),
+    ("how do i make pancakes", "how do i make waffles", False),
+    ("Explain the theory of relativity in simple terms", "explain quantum entanglement in simple terms", False),
+    ("give me tips for better sleep", "give me tips for public speaking", False),
+    ("remind me to call mom", "remind me to call dad", False),
+    # Negations flip the request, however many words the two commands share
+    ("I want to quit my job", "I do not want to quit my job", False),
+    ("delete my account", "do not delete my account", False),
+    ("cancel my subscription", "don't cancel my subscription", False),
+    ("send the email now", "never send the email", False),
+    # So do amounts, dates and times
+    ("transfer 500 dollars to my savings account", "transfer 5000 dollars to my savings account", False),
+    ("schedule a meeting tomorrow morning", "schedule a meeting friday morning", False),
+    ("set an alarm for 7am", "set an alarm for 8am", False),
+    ("book a table for two", "book a table for four", False),
+    ("schedule a meeting tomorrow morning", "could you schedule a meeting tomorrow morning", True),
+    ("transfer 500 dollars to savings", "please transfer 500 dollars to my savings", True),
+]
+
+WORDS = ("weather time capital translate explain poem story recipe tips history distance price "
+         "population meaning song movie book city country river planet language sport team").split()
+
+
+def similarity(cached: str, later: str) -> float:
+    """Cosine similarity as the cache sees it: commands with different signatures never match"""
+    if signature(cached) != signature(later):
+        return -1.0
+    return float(embed(cached) @ embed(later))
+
+
+def sweep(thresholds):
+    similarities = [
+        (similarity(cached, later), should_hit)
+        for cached, later, should_hit in PAIRS
+    ]
+    positives = sum(should_hit for _, should_hit in similarities)
+    negatives = len(similarities) - positives
+    for threshold in thresholds:
+        hits = sum(similarity >= threshold and should_hit for similarity, should_hit in similarities)
+        false_hits = sum(similarity >= threshold and not should_hit for similarity, should_hit in similarities)
+        marker = " <- default" if threshold == SEMANTIC_CACHE_THRESHOLD else ""
+        print(f"threshold {threshold:.2f}: paraphrase hits {hits}/{positives}, "
+              f"false hits {false_hits}/{negatives}{marker}")
+
+
+def main(entries: int, lookups: int, verbose: bool):
+    if verbose:
+        for cached, later, should_hit in PAIRS:
+            print(f"{float(embed(cached) @ embed(later)):.3f} {similarity(cached, later):6.3f} "
+                  f"{'hit ' if should_hit else 'miss'} "
+                  f"{cached!r} / {later!r}")
+    sweep(sorted({0.75, 0.8, 0.85, 0.9, 0.95, SEMANTIC_CACHE_THRESHOLD}))
+
+    rng = random.Random(7)
+    cache = SemanticCache(max_entries=entries)
+    commands = [" ".join(rng.choice(WORDS) for _ in range(6)) + f" {i}" for i in range(entries)]
+    start = time.perf_counter()
+    for command in commands:
+        cache.set("openai", command, "interpretation")
+    fill = time.perf_counter() - start
+
+    samples = []
+    for _ in range(lookups):
+        query = rng.choice(commands)
+        start = time.perf_counter()
+        cache.get("openai", query)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"index: {entries} entries x {cache.dimensions} dims, "
+          f"{cache._vectors.nbytes / 1e6:.1f} MB, fill {fill / entries * 1e6:.1f} us/entry")
+    print(f"lookup: median {statistics.median(samples) * 1e3:.3f} ms, "
+          f"p99 {samples[int(len(samples) * 0.99) - 1] * 1e3:.3f} ms, stats {cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    main(args.entries, args.lookups, args.verbose)
@@ -0,0 +1,140 @@
+"""Compare server CPU and update latency: /ws/tasks push vs /task-status polling.
+
+Usage (from backend/, Linux only - reads CPU time from /proc):
+    python benchmarks/bench_task_ws.py --clients 1000 --poll-interval 1
+
+Each mode submits background data-extraction jobs and has every client follow
+one of them until it finishes, either over a WebSocket subscription or by
+polling /task-status. Reported per mode: server CPU seconds, requests or
+messages handled, and how long after the job finished each client noticed.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+SERVER = """
+import main, uvicorn
+uvicorn.run(main.app, host="127.0.0.1", port={port}, log_level="warning", backlog=4096)
+"""
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15 of the full line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def completion_lag(state):
+    """Seconds between the server finishing a job and this client learning about it"""
+    return time.time() - datetime.fromisoformat(state["finished_at"]).timestamp()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+async def submit_jobs(client, count):
+    task_ids = []
+    for _ in range(count):
+        response = await client.post("/browser-automation",
+                                     data={"task_type": "data-extraction", "background": "true"})
+        task_ids.append(response.json()["task_id"])
+    return task_ids
+
+
+async def follow_ws(port, task_id, lags):
+    import websockets
+
+    messages = 0
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/tasks?task_ids={task_id}") as ws:
+        async for raw in ws:
+            messages += 1
+            event = json.loads(raw)
+            if event.get("status") in FINAL_STATUSES:
+                lags.append(completion_lag(event))
+                return messages
+    return messages
+
+
+async def follow_poll(client, task_id, interval, lags):
+    requests = 0
+    while True:
+        requests += 1
+        status = (await client.get(f"/task-status/{task_id}")).json()
+        if status["status"] in FINAL_STATUSES:
+            lags.append(completion_lag(status))
+            return requests
+        await asyncio.sleep(interval)
+
+
+async def run_mode(mode, port, pid, clients, jobs, interval):
+    import httpx
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+        lags = []
+        before = cpu_seconds(pid)
+        start = time.perf_counter()
+        task_ids = await submit_jobs(client, jobs)
+        if mode == "ws":
+            followers = (follow_ws(port, task_ids[i % jobs], lags) for i in range(clients))
+        else:
+            followers = (follow_poll(client, task_ids[i % jobs], interval, lags) for i in range(clients))
+        counts = await asyncio.gather(*followers)
+
+        elapsed = time.perf_counter() - start
+        used = cpu_seconds(pid) - before
+
+    unit = "messages" if mode == "ws" else "requests"
+    print(f"{mode:>4}: server CPU {used:6.2f}s over {elapsed:5.2f}s, {sum(counts)} {unit}, "
+          f"completion lag p50 {percentile(lags, 0.5) * 1000:.0f} ms p95 {percentile(lags, 0.95) * 1000:.0f} ms")
+
+
+def main(clients, jobs, interval, port):
+    # Every client holds a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, clients * 2 + 256)), hard))
+
+    env = dict(os.environ,
+               DATABASE_PATH=os.path.join(tempfile.mkdtemp(), "bench.db"),
+               TASK_WORKERS=str(jobs))
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(port=port)], cwd=BACKEND_DIR, env=env
+    )
+    try:
+        import httpx
+
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        print(f"clients={clients} jobs={jobs} poll_interval={interval}s")
+        asyncio.run(run_mode("poll", port, server.pid, clients, jobs, interval))
+        asyncio.run(run_mode("ws", port, server.pid, clients, jobs, interval))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    main(args.clients, args.jobs, args.poll_interval, args.port)
@@ -0,0 +1,83 @@
+"""Measure server peak RSS while many clients upload large files to /voice-input.
+
+Usage (from backend/, Linux only - reads VmHWM from /proc):
+    python benchmarks/bench_voice_upload.py --clients 50 --size-mb 10
+
+The server runs in a separate uvicorn process with Whisper transcription
+replaced by a constant result, so only upload handling is measured.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+import main, uvicorn
+main.openai.api_key = main.openai.api_key or "benchmark"
+main.transcribe_audio_file = lambda path: {{"text": "benchmark", "language": "en"}}
+uvicorn.run(main.app, host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def upload_all(port: int, clients: int, size_mb: int) -> float:
+    import httpx
+
+    payload = os.urandom(1024 * 1024)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        async def one():
+            # Build the multipart body once per client; the server side is what we measure
+            files = {"audio_file": ("sample.wav", payload * size_mb, "audio/wav")}
+            response = await client.post("/voice-input", files=files)
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(clients)))
+        return time.perf_counter() - start
+
+
+def main(clients: int, size_mb: int, port: int):
+    env = dict(os.environ, DATABASE_PATH=os.path.join(tempfile.mkdtemp(), "bench.db"))
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(port=port)], cwd=BACKEND_DIR, env=env
+    )
+    try:
+        import httpx
+
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        idle = peak_rss_mb(server.pid)
+        elapsed = asyncio.run(upload_all(port, clients, size_mb))
+        peak = peak_rss_mb(server.pid)
+        print(f"clients={clients} size={size_mb}MB elapsed={elapsed:.2f}s")
+        print(f"server peak RSS: idle {idle:.1f} MB -> under load {peak:.1f} MB "
+              f"(+{peak - idle:.1f} MB for {clients * size_mb} MB uploaded)")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    main(args.clients, args.size_mb, args.port)
@@ -0,0 +1,269 @@
+import os
+import asyncio
+import logging
+import ipaddress
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:  # Playwright is optional; automations fall back to simulated results
+    async_playwright = None
+
+# Warm pool of Playwright browsers for browser automation jobs.
+# Chromium processes are launched once and shared; every job gets its own
+# short-lived browser context (separate cookies, storage and cache), so jobs
+# stay isolated without paying for a browser launch. Browsers are recycled
+# after BROWSER_MAX_USES contexts or when they stop responding, and jobs
+# beyond BROWSER_MAX_CONTEXTS wait in line for a free slot. Pages may only
+# load http(s) URLs on public addresses (optionally only BROWSER_ALLOWED_HOSTS);
+# every request a page makes is checked, so redirects cannot reach internal hosts.
+
+BROWSER_POOL_ENABLED = os.getenv("BROWSER_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_CONTEXTS = int(os.getenv("BROWSER_MAX_CONTEXTS", "8"))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "100"))
+BROWSER_QUEUE_TIMEOUT_SECONDS = float(os.getenv("BROWSER_QUEUE_TIMEOUT_SECONDS", "30"))
+BROWSER_NAVIGATION_TIMEOUT_MS = float(os.getenv("BROWSER_NAVIGATION_TIMEOUT_MS", "15000"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() in ("1", "true", "yes")
+# Comma-separated hosts pages may load (subdomains included); empty allows any public host
+BROWSER_ALLOWED_HOSTS = [
+    host.strip().lower().lstrip(".") for host in os.getenv("BROWSER_ALLOWED_HOSTS", "").split(",") if host.strip()
+]
+
+logger = logging.getLogger(__name__)
+
+# Maps each matched element to a record; field selectors are "css" for text
+# content or "css@attribute" for an attribute, and "" / "@attr" target the element itself
+EXTRACT_RECORDS_JS = """
+(items, fields) => items.map(item => {
+    if (!fields) return item.textContent.trim();
+    const record = {};
+    for (const [name, spec] of Object.entries(fields)) {
+        const [css, attr] = spec.split('@');
+        const el = css ? item.querySelector(css) : item;
+        record[name] = el ? (attr ? el.getAttribute(attr) : el.textContent.trim()) : null;
+    }
+    return record;
+})
+"""
+
+
+class BrowserPoolError(Exception):
+    """Raised when no browser slot frees up in time or the pool cannot launch browsers"""
+
+
+class BrowserLaunchError(BrowserPoolError):
+    """Raised when Playwright is installed but no browser can be launched"""
+
+
+class BlockedURLError(ValueError):
+    """Raised for URLs pages may not load: other schemes, disallowed or non-public hosts"""
+
+
+def url_rejection(url: str) -> Optional[str]:
+    """Why url may not be loaded, judged without DNS (scheme, allowlist, literal IPs), or None"""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return f"scheme {parts.scheme or '(none)'!r} is not allowed"
+    host = (parts.hostname or "").lower()
+    if not host:
+        return "URL has no host"
+    if BROWSER_ALLOWED_HOSTS and not any(host == h or host.endswith("." + h) for h in BROWSER_ALLOWED_HOSTS):
+        return f"host {host} is not in BROWSER_ALLOWED_HOSTS"
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None
+    return None if address.is_global else f"address {host} is not public"
+
+
+async def blocked_reason(url: str) -> Optional[str]:
+    """Why url may not be loaded, including hosts that resolve to non-public addresses, or None"""
+    reason = url_rejection(url)
+    if reason:
+        return reason
+    host = urlsplit(url).hostname
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError:
+        return f"host {host} does not resolve"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global:
+            return f"host {host} resolves to non-public address {address}"
+    return None
+
+
+async def check_url(url: str):
+    reason = await blocked_reason(url)
+    if reason:
+        raise BlockedURLError(f"URL not allowed: {reason}")
+
+
+async def guard_requests(route):
+    """Playwright route handler aborting requests to URLs pages may not load"""
+    reason = await blocked_reason(route.request.url)
+    if reason:
+        logger.warning("Blocked browser request to %s: %s", route.request.url, reason)
+        await route.abort("blockedbyclient")
+    else:
+        await route.continue_()
+
+
+class PooledBrowser:
+    """A launched browser and its usage counters"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.uses = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser.is_connected()
+
+
+class BrowserPool:
+    """Bounded pool of warm browsers handing out isolated pages"""
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_contexts: int = BROWSER_MAX_CONTEXTS,
+                 max_uses: int = BROWSER_MAX_USES, queue_timeout: float = BROWSER_QUEUE_TIMEOUT_SECONDS,
+                 launcher=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_contexts)
+        self._launcher = launcher
+        self._playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._retiring: List[PooledBrowser] = []
+        self._lock = asyncio.Lock()
+        self.waiting = 0
+        self.counters = {"launches": 0, "recycles": 0, "uses": 0, "queue_timeouts": 0}
+
+    @property
+    def available(self) -> bool:
+        return self._launcher is not None or (BROWSER_POOL_ENABLED and async_playwright is not None)
+
+    async def _launch(self) -> PooledBrowser:
+        try:
+            if self._launcher is not None:
+                browser = await self._launcher()
+            else:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                browser = await self._playwright.chromium.launch(
+                    headless=BROWSER_HEADLESS,
+                    args=["--disable-dev-shm-usage"],
+                )
+        except Exception as e:
+            raise BrowserLaunchError(f"Browser launch failed: {str(e).splitlines()[0]}")
+        self.counters["launches"] += 1
+        return PooledBrowser(browser)
+
+    async def start(self):
+        """Launch the browsers up front so the first jobs do not pay for it"""
+        if not self.available:
+            return
+        try:
+            async with self._lock:
+                while len(self._browsers) < self.size:
+                    self._browsers.append(await self._launch())
+        except Exception as e:
+            # Jobs retry the launch on demand; the app must still come up without a browser
+            logger.warning("Browser pool warm-up failed: %s", e)
+
+    async def stop(self):
+        async with self._lock:
+            for pooled in self._browsers + self._retiring:
+                await self._close(pooled)
+            self._browsers.clear()
+            self._retiring.clear()
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _close(self, pooled: PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            logger.warning("Closing browser failed: %s", e)
+
+    async def _checkout(self) -> PooledBrowser:
+        async with self._lock:
+            # Replace browsers that crashed or reached their use budget
+            for pooled in list(self._browsers):
+                if not pooled.healthy or pooled.uses >= self.max_uses:
+                    self._browsers.remove(pooled)
+                    self._retiring.append(pooled)
+                    self.counters["recycles"] += 1
+            await self._reap()
+            while len(self._browsers) < self.size:
+                self._browsers.append(await self._launch())
+
+            pooled = min(self._browsers, key=lambda b: b.active)
+            pooled.active += 1
+            pooled.uses += 1
+            self.counters["uses"] += 1
+            return pooled
+
+    async def _checkin(self, pooled: PooledBrowser):
+        async with self._lock:
+            pooled.active -= 1
+            await self._reap()
+
+    async def _reap(self):
+        # Retired browsers are closed once their last context is done
+        for pooled in [b for b in self._retiring if b.active == 0]:
+            self._retiring.remove(pooled)
+            await self._close(pooled)
+
+    @asynccontextmanager
+    async def page(self, **context_options) -> AsyncIterator:
+        """Yield a page in a fresh browser context, waiting for a free slot if saturated"""
+        if not self.available:
+            raise BrowserPoolError("Playwright is not available")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counters["queue_timeouts"] += 1
+            raise BrowserPoolError(f"No browser available within {self.queue_timeout:g}s")
+        finally:
+            self.waiting -= 1
+
+        try:
+            pooled = await self._checkout()
+            try:
+                context = await pooled.browser.new_context(**context_options)
+                try:
+                    context.set_default_timeout(BROWSER_NAVIGATION_TIMEOUT_MS)
+                    await context.route("**/*", guard_requests)
+                    yield await context.new_page()
+                finally:
+                    await context.close()
+            finally:
+                await self._checkin(pooled)
+        finally:
+            self.semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            **self.counters,
+            "available": self.available,
+            "browsers": len(self._browsers),
+            "retiring": len(self._retiring),
+            "active_contexts": sum(b.active for b in self._browsers + self._retiring),
+            "waiting": self.waiting,
+        }
+
+
+async def extract_records(page, item_selector: str, fields: Optional[Dict[str, str]] = None) -> List:
+    """Text of every element matching item_selector, or one dict per element when fields are given"""
+    return await page.eval_on_selector_all(item_selector, EXTRACT_RECORDS_JS, fields)
+
+
+browser_pool = BrowserPool()
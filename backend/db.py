@@ -0,0 +1,142 @@
+import os
+import re
+import time
+import queue
+import sqlite3
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+# Shared SQLite data-access layer.
+# Connections are opened once, tuned with pragmas and handed out from a bounded
+# pool; every query runs on a worker thread so the event loop never blocks.
+
+DATABASE_PATH = os.getenv("DATABASE_PATH", "astramind.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+
+# sqlite3 keeps a per-connection LRU of prepared statements keyed by SQL text,
+# so constant query strings are compiled once per pooled connection.
+DB_STATEMENT_CACHE_SIZE = 256
+
+# "SELECT ... FROM reminders" -> "select reminders", for naming ad-hoc statements
+_STATEMENT = re.compile(r"^\s*(\w+)\s+(?:.*?\b(?:FROM|INTO|TABLE)\s+)?(\w+)", re.IGNORECASE | re.DOTALL)
+
+# Called on the worker thread with (operation, seconds) after each transaction
+Listener = Callable[[str, float], None]
+
+
+def statement_name(sql: str) -> str:
+    match = _STATEMENT.match(sql)
+    return f"{match.group(1)} {match.group(2)}".lower() if match else "sql"
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=134217728",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}",
+)
+
+
+class Database:
+    """Bounded SQLite connection pool executed off the event loop"""
+
+    def __init__(self, path: str = DATABASE_PATH, pool_size: int = DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self._pool: Optional[queue.Queue] = None
+        self._connections: list = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener):
+        """Register a timing hook called with each transaction's operation name and duration"""
+        self._listeners.append(listener)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def open(self):
+        """Open the pool (idempotent)"""
+        with self._lock:
+            if self._pool is not None:
+                return
+            pool = queue.Queue(maxsize=self.pool_size)
+            for _ in range(self.pool_size):
+                conn = self._connect()
+                self._connections.append(conn)
+                pool.put(conn)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="astramind-db"
+            )
+            self._pool = pool
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            if self._pool is None:
+                return
+            self._executor.shutdown(wait=True)
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._executor = None
+            self._pool = None
+
+    def _run_sync(self, operation: str, fn: Callable, *args) -> Any:
+        conn = self._pool.get()
+        start = time.perf_counter()
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+            elapsed = time.perf_counter() - start
+            for listener in self._listeners:
+                listener(operation, elapsed)
+
+    async def _submit(self, operation: str, fn: Callable, *args) -> Any:
+        if self._pool is None:
+            self.open()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run_sync, operation, fn, *args)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(conn, *args) in one transaction on a pooled connection"""
+        return await self._submit(fn.__name__, fn, *args)
+
+    async def execute(self, sql: str, params: Iterable = ()) -> int:
+        """Execute a write statement and return the last row id"""
+        return await self._submit(statement_name(sql), lambda conn: conn.execute(sql, params).lastrowid)
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Iterable]) -> int:
+        """Execute a write statement for many parameter sets in one transaction"""
+        rows = list(seq_of_params)
+        if not rows:
+            return 0
+        return await self._submit(statement_name(sql), lambda conn: conn.executemany(sql, rows).rowcount)
+
+    async def fetchone(self, sql: str, params: Iterable = ()) -> Optional[tuple]:
+        return await self._submit(statement_name(sql), lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Iterable = ()) -> list:
+        return await self._submit(statement_name(sql), lambda conn: conn.execute(sql, params).fetchall())
+
+
+db = Database()
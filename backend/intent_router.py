@@ -0,0 +1,217 @@
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Local intent routing for /task-execute.
+# All trigger keywords are compiled into one alternation with a named group
+# per intent, so a command is scanned once; anchored templates then pull out
+# slots (reminder task and time, message recipient and body, job role and
+# location, video topic). Commands whose best intent scores below
+# ROUTER_CONFIDENCE_THRESHOLD are left to the LLM.
+
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.6"))
+
+TEMPLATE_CONFIDENCE = 0.95
+# A keyword alone is not enough to act on; it only selects which templates to try
+KEYWORD_CONFIDENCE = 0.5
+MISSING_SLOT_PENALTY = 0.4
+AMBIGUITY_PENALTY = 0.2
+
+KEYWORDS = {
+    "reminder": r"remind(?:er|ers)?|alarm",
+    "message": r"whatsapp|message|text|sms",
+    "job_search": r"jobs?|hiring|openings?|vacanc(?:y|ies)|positions?",
+    "youtube_summary": r"youtube|videos?",
+}
+_KEYWORDS = re.compile(
+    r"\b(?:" + "|".join(f"(?P<{intent}>{pattern})" for intent, pattern in KEYWORDS.items()) + r")\b",
+    re.IGNORECASE,
+)
+
+_PREFIX = r"^(?:(?:hey|hi|ok)\s+astra(?:mind)?\W*\s*)?(?:(?:please|can you|could you|would you)\s+)*"
+
+TEMPLATES = {
+    "reminder": re.compile(
+        _PREFIX + r"(?:remind me|set (?:a |an )?(?:reminder|alarm)|create (?:a )?reminder|add (?:a )?reminder)"
+        r"(?:\s+(?:to|about|that|for|of)\b)?\s*:?\s*(?P<task>.*?)[.!?]*$",
+        re.IGNORECASE,
+    ),
+    # Recipients are one word, optionally after the/my, plus a capitalised surname ("Ravi Kumar")
+    "message": re.compile(
+        _PREFIX + r"(?:(?P<send>send)(?:\s+an?)?(?:\s+(?:whatsapp|text|sms))?(?:\s+message)?|message|text|whatsapp|sms)"
+        r"(?:\s+(?:(?P<to>to)\s+)?(?P<recipient>(?:(?:the|my)\s+)?(?!saying\b|that\b|on\b|via\b)[a-z][\w']*"
+        r"(?:\s+(?-i:[A-Z][\w']*))?))?"
+        r"(?:\s+(?:on|via)\s+(?P<platform>whatsapp|sms))?"
+        r"(?:(?:\s*(?P<marker>saying|that|:)\s*|\s+)(?P<content>.+?))?[.!?]*$",
+        re.IGNORECASE,
+    ),
+    "job_search": re.compile(
+        _PREFIX + r"(?:find|search(?: for)?|look(?:ing)? for|show(?: me)?|get)\s+(?:me\s+)?(?:some\s+)?"
+        r"(?:(?:jobs?|openings?|positions?)\s+(?:for|as)\s+(?:an?\s+)?(?P<role_after>.+?)"
+        r"|(?:an?\s+)?(?P<role>.+?)\s+(?:jobs?|openings?|positions?|roles?))"
+        r"(?:\s+(?:in|at|near)\s+(?P<location>.+?))?[.!?]*$",
+        re.IGNORECASE,
+    ),
+    "youtube_summary": re.compile(
+        _PREFIX + r"(?:(?:summari[sz]e|give me a summary of|summary of)\s+(?:the\s+)?(?:top\s+)?"
+        r"(?:youtube\s+)?(?:videos?\s+)?(?:on\s+youtube\s+)?(?:about|on|for|of|regarding)?\s*(?P<topic>.+?)"
+        r"(?:\s+(?:videos?|on youtube))?"
+        r"|what do(?:es)?\s+(?:youtube\s+)?(?:videos?\s+)?(?:on youtube\s+)?say\s+(?:about|on)\s+(?P<topic_asked>.+?))"
+        r"[.!?]*$",
+        re.IGNORECASE,
+    ),
+}
+
+REQUIRED_SLOTS = {
+    "reminder": ("task",),
+    "message": ("recipient",),
+    "job_search": ("role",),
+    "youtube_summary": ("topic",),
+}
+
+# Time expressions for reminders: "in 10 minutes", "at 5pm", "tomorrow at 9:30", "tonight"
+_RELATIVE_TIME = re.compile(
+    r"\s*\bin\s+(?P<amount>\d+|an?|one|half an?)\s+(?P<unit>min(?:ute)?s?|hours?|hrs?|days?)\b", re.IGNORECASE
+)
+_CLOCK_TIME = re.compile(
+    r"\s*\b(?:(?P<day>today|tomorrow)\s+)?(?:at\s+)?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>am|pm)?"
+    r"(?:\s+(?P<day_after>today|tomorrow))?\b",
+    re.IGNORECASE,
+)
+_DAY_WORD = re.compile(r"\s*\b(?P<word>tonight|tomorrow(?: morning| evening)?|this (?:morning|afternoon|evening))\b",
+                       re.IGNORECASE)
+_DAY_WORD_HOURS = {"tonight": 20, "tomorrow": 9, "tomorrow morning": 9, "tomorrow evening": 18,
+                   "this morning": 9, "this afternoon": 15, "this evening": 18}
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass
+class RoutedIntent:
+    intent: Optional[str]
+    confidence: float
+    slots: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def local(self) -> bool:
+        return self.intent is not None and self.confidence >= ROUTER_CONFIDENCE_THRESHOLD
+
+
+def extract_time(text: str, now: Optional[datetime] = None) -> Tuple[Optional[datetime], str]:
+    """Find a time expression in text; returns (when, text without it)"""
+    now = now or datetime.now()
+
+    match = _RELATIVE_TIME.search(text)
+    if match:
+        amount = match.group("amount").lower()
+        if amount.startswith("half"):
+            value = 0.5
+        elif amount in ("a", "an", "one"):
+            value = 1
+        else:
+            value = int(amount)
+        seconds = value * _UNIT_SECONDS[match.group("unit")[0].lower()]
+        return now + timedelta(seconds=seconds), (text[:match.start()] + text[match.end():]).strip()
+
+    for match in _CLOCK_TIME.finditer(text):
+        # A bare number is not a time; it needs "at", am/pm, minutes or a day word
+        explicit = match.group("meridiem") or match.group("minute") or match.group("day") \
+            or match.group("day_after") or re.match(r"\s*\b(?:\w+\s+)?at\s", match.group(0), re.IGNORECASE)
+        hour = int(match.group("hour"))
+        minute = int(match.group("minute") or 0)
+        if not explicit or hour > 23 or minute > 59:
+            continue
+        meridiem = (match.group("meridiem") or "").lower()
+        if meridiem == "pm" and hour < 12:
+            hour += 12
+        elif meridiem == "am" and hour == 12:
+            hour = 0
+        when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        day = (match.group("day") or match.group("day_after") or "").lower()
+        if day == "tomorrow" or (not day and when <= now):
+            when += timedelta(days=1)
+        return when, (text[:match.start()] + text[match.end():]).strip()
+
+    match = _DAY_WORD.search(text)
+    if match:
+        word = match.group("word").lower()
+        when = now.replace(hour=_DAY_WORD_HOURS[word], minute=0, second=0, microsecond=0)
+        if word.startswith("tomorrow") or when <= now:
+            when += timedelta(days=1)
+        return when, (text[:match.start()] + text[match.end():]).strip()
+
+    return None, text
+
+
+def _explicit_message(match: re.Match) -> bool:
+    """A send verb, "to <recipient>" or "<recipient> saying ...": "text summarization explained" is not a message"""
+    return bool(match.group("send") or match.group("to") or (match.group("marker") or "").lower() == "saying")
+
+
+# Extra checks a template match must pass before the command counts as that intent
+TEMPLATE_GUARDS = {
+    "message": _explicit_message,
+}
+
+
+def _clean(value: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", value or "").strip(" ,.;:!?\"'")
+
+
+def extract_slots(intent: str, match: Optional[re.Match], command: str) -> Dict[str, str]:
+    if match is None:
+        return {}
+    groups = match.groupdict()
+    if intent == "reminder":
+        when, task = extract_time(groups.get("task") or "")
+        task = re.sub(r"^(?:to|about|that)\s+", "", _clean(task), flags=re.IGNORECASE)
+        # "Set an alarm for 7am" has a time but nothing to be reminded of
+        slots = {"task": task or ("Reminder" if when is not None else "")}
+        if when is not None:
+            slots["time"] = when.isoformat()
+        return slots
+    if intent == "message":
+        slots = {
+            "recipient": _clean(groups.get("recipient")),
+            "content": _clean(groups.get("content")),
+            "platform": (groups.get("platform") or ("sms" if re.search(r"\b(?:sms|text)\b", command, re.IGNORECASE)
+                                                      else "whatsapp")).lower(),
+        }
+        return {key: value for key, value in slots.items() if value}
+    if intent == "job_search":
+        slots = {"role": _clean(groups.get("role") or groups.get("role_after")),
+                 "location": _clean(groups.get("location"))}
+        return {key: value for key, value in slots.items() if value}
+    if intent == "youtube_summary":
+        topic = _clean(groups.get("topic") or groups.get("topic_asked"))
+        topic = re.sub(r"^(?:youtube|videos?)\s+(?:about|on)\s+", "", topic, flags=re.IGNORECASE)
+        return {"topic": topic} if topic else {}
+    return {}
+
+
+def route(command: str) -> RoutedIntent:
+    """Classify a command into a local intent with slots, or intent None for the LLM"""
+    hits: Dict[str, int] = {}
+    for match in _KEYWORDS.finditer(command):
+        hits[match.lastgroup] = hits.get(match.lastgroup, 0) + 1
+    if not hits:
+        return RoutedIntent(None, 0.0)
+
+    candidates: List[RoutedIntent] = []
+    for intent in hits:
+        match = TEMPLATES[intent].match(command.strip())
+        if match and intent in TEMPLATE_GUARDS and not TEMPLATE_GUARDS[intent](match):
+            match = None
+        slots = extract_slots(intent, match, command)
+        confidence = TEMPLATE_CONFIDENCE if match else KEYWORD_CONFIDENCE
+        if any(not slots.get(slot) for slot in REQUIRED_SLOTS[intent]):
+            confidence -= MISSING_SLOT_PENALTY
+        candidates.append(RoutedIntent(intent, confidence, slots))
+
+    candidates.sort(key=lambda candidate: candidate.confidence, reverse=True)
+    best = candidates[0]
+    if len(candidates) > 1 and best.confidence - candidates[1].confidence < 0.1:
+        best.confidence -= AMBIGUITY_PENALTY
+    best.confidence = round(max(best.confidence, 0.0), 2)
+    return best
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from typing import List, Optional
+
+from db import db, Database
+
+# Two-tier cache for LLM responses: a small in-process LRU in front of the
+# llm_cache SQLite table, so repeated prompts survive restarts and are shared
+# between workers.
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000"))
+
+# Trim the disk tier every N stores instead of counting rows on each write
+PRUNE_EVERY = 100
+
+
+def cache_key(provider: str, model: str, messages: List[dict], max_tokens: int) -> str:
+    payload = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "max_tokens": max_tokens},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """In-process LRU backed by a size-bounded SQLite table, both with TTL"""
+
+    def __init__(self, database: Database = db, ttl: float = LLM_CACHE_TTL_SECONDS,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = LLM_CACHE_DISK_ENTRIES):
+        self.db = database
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: OrderedDict = OrderedDict()
+        self._stores_since_prune = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        def lookup(conn: sqlite3.Connection):
+            row = conn.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            return row
+
+        row = await self.db.run(lookup)
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        self.counters["disk_hits"] += 1
+        return value
+
+    async def set(self, key: str, value: dict):
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, value, expires_at)
+        self.counters["stores"] += 1
+        self._stores_since_prune += 1
+        prune = self._stores_since_prune >= PRUNE_EVERY
+        if prune:
+            self._stores_since_prune = 0
+
+        def store(conn: sqlite3.Connection) -> int:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, provider, model, response, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, value.get("provider"), value.get("model"), json.dumps(value), now, expires_at, now),
+            )
+            if not prune:
+                return 0
+            # Drop expired rows, then the least recently used beyond the size cap
+            removed = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.disk_entries,),
+            ).rowcount
+            return removed
+
+        self.counters["evictions"] += await self.db.run(store)
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_entries": len(self._memory),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
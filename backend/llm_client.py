@@ -0,0 +1,498 @@
+import os
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+from llm_cache import LLMCache, LLM_CACHE_ENABLED, cache_key
+
+# Async LLM client shared by every endpoint.
+# One pooled httpx client keeps provider connections alive between requests,
+# and semaphores cap in-flight completions globally and per provider.
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-4o-mini")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
+ANTHROPIC_VERSION = "2023-06-01"
+# Azure OpenAI is registered only when an endpoint and deployment are configured
+AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
+AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "")
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_PROVIDER_CONCURRENCY = int(os.getenv("LLM_PROVIDER_CONCURRENCY", "16"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_ENABLE_STUB = os.getenv("LLM_ENABLE_STUB", "false").lower() in ("1", "true", "yes")
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "200"))
+
+
+# Called with (provider, outcome, seconds, usage) after every completion;
+# outcome is ok, cached, error, timeout or cancelled
+Listener = Callable[[str, str, float, Dict[str, int]], None]
+
+
+class LLMError(Exception):
+    """Raised when a provider call fails or times out"""
+
+
+@dataclass
+class ChatResult:
+    content: str
+    provider: str
+    model: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    cached: bool = False
+
+
+class LLMProvider:
+    """Base class for chat completion providers"""
+
+    name = "base"
+    default_model = LLM_DEFAULT_MODEL
+
+    def __init__(self, max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def configured(self) -> bool:
+        """Whether calls can succeed without a per-request API key"""
+        return True
+
+    async def chat(self, messages: List[dict], model: str, max_tokens: int,
+                   api_key: Optional[str] = None) -> ChatResult:
+        raise NotImplementedError
+
+    async def stream_chat(self, messages: List[dict], model: str, max_tokens: int,
+                          api_key: Optional[str] = None,
+                          usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        """Yield completion text as it arrives (whole response for non-streaming providers)
+
+        Token counts the provider reports are written into usage as they arrive.
+        """
+        result = await self.chat(messages, model, max_tokens, api_key=api_key)
+        if usage is not None:
+            usage.update(result.usage)
+        yield result.content
+
+    async def aclose(self):
+        pass
+
+
+class HTTPProvider(LLMProvider):
+    """Provider reached over its own keep-alive HTTP connection pool"""
+
+    label = "Provider"
+
+    def __init__(self, base_url: str, api_key: Optional[str], name: Optional[str] = None,
+                 max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        super().__init__(max_concurrency)
+        if name:
+            self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                ),
+            )
+        return self._client
+
+    def _key(self, api_key: Optional[str]) -> str:
+        key = api_key or self.api_key
+        if not key:
+            raise LLMError(f"{self.label} API key required")
+        return key
+
+    async def _post(self, path: str, headers: dict, body: dict, params: Optional[dict] = None) -> dict:
+        try:
+            response = await self.client.post(path, headers=headers, json=body, params=params)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise LLMError(f"{self.label} returned {e.response.status_code}: {e.response.text[:200]}")
+        except httpx.HTTPError as e:
+            raise LLMError(f"{self.label} request failed: {e!r}")
+        return response.json()
+
+    async def _stream_events(self, path: str, headers: dict, body: dict,
+                             params: Optional[dict] = None) -> AsyncIterator[str]:
+        """Yield the data payload of each server-sent event"""
+        try:
+            async with self.client.stream("POST", path, headers=headers, json=body, params=params) as response:
+                if response.status_code >= 400:
+                    error = await response.aread()
+                    raise LLMError(f"{self.label} returned {response.status_code}: "
+                                   f"{error[:200].decode(errors='replace')}")
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        yield line[len("data: "):]
+        except httpx.HTTPError as e:
+            raise LLMError(f"{self.label} request failed: {e!r}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class OpenAIProvider(HTTPProvider):
+    """OpenAI chat completions over a keep-alive HTTP connection pool
+
+    Also serves any OpenAI-compatible endpoint registered under another name.
+    """
+
+    name = "openai"
+    label = "OpenAI"
+    # Ask for a final usage chunk on streams (stream_options.include_usage)
+    stream_usage = True
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: Optional[str] = None,
+                 name: Optional[str] = None, max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        super().__init__(base_url, api_key if api_key is not None else os.getenv("OPENAI_API_KEY"),
+                         name=name, max_concurrency=max_concurrency)
+
+    def _headers(self, key: str) -> dict:
+        return {"Authorization": f"Bearer {key}"}
+
+    def _request(self, model: str, body: dict):
+        """Path, query params and body of a chat completion request"""
+        return "/chat/completions", None, {"model": model, **body}
+
+    async def chat(self, messages: List[dict], model: str, max_tokens: int,
+                   api_key: Optional[str] = None) -> ChatResult:
+        path, params, body = self._request(model, {"messages": messages, "max_tokens": max_tokens})
+        data = await self._post(path, self._headers(self._key(api_key)), body, params)
+        return ChatResult(
+            content=data["choices"][0]["message"]["content"],
+            provider=self.name,
+            model=data.get("model", model),
+            usage=data.get("usage", {}),
+        )
+
+    async def stream_chat(self, messages: List[dict], model: str, max_tokens: int,
+                          api_key: Optional[str] = None,
+                          usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        request = {"messages": messages, "max_tokens": max_tokens, "stream": True}
+        if self.stream_usage:
+            request["stream_options"] = {"include_usage": True}
+        path, params, body = self._request(model, request)
+        events = self._stream_events(path, self._headers(self._key(api_key)), body, params)
+        try:
+            # One "data: {json}" line per delta, a usage chunk without choices, then "data: [DONE]"
+            async for payload in events:
+                if payload == "[DONE]":
+                    break
+                data = json.loads(payload)
+                if data.get("usage") and usage is not None:
+                    usage.update(data["usage"])
+                choices = data.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        finally:
+            await events.aclose()
+
+
+class AzureOpenAIProvider(OpenAIProvider):
+    """Azure OpenAI deployment; the deployment fixes the model"""
+
+    name = "azure"
+    label = "Azure OpenAI"
+
+    def __init__(self, endpoint: str = AZURE_OPENAI_ENDPOINT, deployment: str = AZURE_OPENAI_DEPLOYMENT,
+                 api_key: Optional[str] = None, api_version: str = AZURE_OPENAI_API_VERSION,
+                 max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        super().__init__(f"{endpoint.rstrip('/')}/openai/deployments/{deployment}",
+                         api_key if api_key is not None else os.getenv("AZURE_API_KEY"),
+                         max_concurrency=max_concurrency)
+        self.api_version = api_version
+        self.default_model = deployment
+        # Older API versions reject stream_options; their streams report no usage
+        self.stream_usage = api_version >= "2024-06-01"
+
+    def _headers(self, key: str) -> dict:
+        return {"api-key": key}
+
+    def _request(self, model: str, body: dict):
+        return "/chat/completions", {"api-version": self.api_version}, body
+
+
+class AnthropicProvider(HTTPProvider):
+    """Anthropic Messages API; system prompts move to the top-level system field"""
+
+    name = "anthropic"
+    label = "Anthropic"
+    default_model = ANTHROPIC_MODEL
+
+    def __init__(self, base_url: str = ANTHROPIC_BASE_URL, api_key: Optional[str] = None,
+                 name: Optional[str] = None, max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        super().__init__(base_url, api_key if api_key is not None else os.getenv("ANTHROPIC_API_KEY"),
+                         name=name, max_concurrency=max_concurrency)
+
+    def _headers(self, key: str) -> dict:
+        return {"x-api-key": key, "anthropic-version": ANTHROPIC_VERSION}
+
+    @staticmethod
+    def _body(messages: List[dict], model: str, max_tokens: int) -> dict:
+        body = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [message for message in messages if message["role"] != "system"],
+        }
+        system = "\n\n".join(message["content"] for message in messages if message["role"] == "system")
+        if system:
+            body["system"] = system
+        return body
+
+    async def chat(self, messages: List[dict], model: str, max_tokens: int,
+                   api_key: Optional[str] = None) -> ChatResult:
+        data = await self._post("/v1/messages", self._headers(self._key(api_key)),
+                                self._body(messages, model, max_tokens))
+        usage = data.get("usage", {})
+        return ChatResult(
+            content="".join(block.get("text", "") for block in data.get("content", [])),
+            provider=self.name,
+            model=data.get("model", model),
+            usage={
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+            },
+        )
+
+    async def stream_chat(self, messages: List[dict], model: str, max_tokens: int,
+                          api_key: Optional[str] = None,
+                          usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        body = {**self._body(messages, model, max_tokens), "stream": True}
+        events = self._stream_events("/v1/messages", self._headers(self._key(api_key)), body)
+        usage = {} if usage is None else usage
+        try:
+            async for payload in events:
+                event = json.loads(payload)
+                # Input tokens arrive with message_start, the output count with message_delta
+                if event.get("type") == "message_start":
+                    counts = event.get("message", {}).get("usage", {})
+                    usage["prompt_tokens"] = counts.get("input_tokens", 0)
+                    usage["completion_tokens"] = counts.get("output_tokens", 0)
+                elif event.get("type") == "message_delta":
+                    usage["completion_tokens"] = event.get("usage", {}).get("output_tokens", 0)
+                elif event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
+                elif event.get("type") == "error":
+                    raise LLMError(f"Anthropic stream failed: {event.get('error', {}).get('message')}")
+        finally:
+            await events.aclose()
+
+
+class StubProvider(LLMProvider):
+    """Local provider with fixed latency for offline load testing"""
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = LLM_STUB_LATENCY_MS,
+                 max_concurrency: int = LLM_PROVIDER_CONCURRENCY):
+        super().__init__(max_concurrency)
+        self.latency_ms = latency_ms
+
+    async def chat(self, messages: List[dict], model: str, max_tokens: int,
+                   api_key: Optional[str] = None) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        prompt = messages[-1]["content"] if messages else ""
+        content = f"[STUB] {prompt[:200]}"
+        return ChatResult(
+            content=content,
+            provider=self.name,
+            model=model,
+            usage={
+                "prompt_tokens": sum(len(m["content"].split()) for m in messages),
+                "completion_tokens": len(content.split()),
+            },
+        )
+
+    async def stream_chat(self, messages: List[dict], model: str, max_tokens: int,
+                          api_key: Optional[str] = None,
+                          usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        # First token after the configured latency, then a steady trickle
+        await asyncio.sleep(self.latency_ms / 1000)
+        prompt = messages[-1]["content"] if messages else ""
+        words = f"[STUB] {prompt[:200]}".split(" ")
+        if usage is not None:
+            usage.update(
+                prompt_tokens=sum(len(m["content"].split()) for m in messages),
+                completion_tokens=len(words),
+            )
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(0.005)
+            yield word if index == 0 else f" {word}"
+
+
+class LLMClient:
+    """Routes chat calls to registered providers under concurrency limits and timeouts"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 timeout: float = LLM_TIMEOUT_SECONDS,
+                 cache: Optional[LLMCache] = None):
+        self.providers: Dict[str, LLMProvider] = {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.timeout = timeout
+        self.cache = cache
+        self._listeners: List[Listener] = []
+
+    def add_listener(self, listener: Listener):
+        """Register a hook called after each completion with its outcome and timing"""
+        self._listeners.append(listener)
+
+    def _notify(self, provider: str, outcome: str, start: float, usage: Optional[Dict[str, int]] = None):
+        elapsed = time.perf_counter() - start
+        for listener in self._listeners:
+            listener(provider, outcome, elapsed, usage or {})
+
+    def register(self, provider: LLMProvider):
+        self.providers[provider.name] = provider
+
+    def has_provider(self, name: str) -> bool:
+        return name in self.providers
+
+    async def chat(self, messages: List[dict], provider: str = "openai",
+                   model: Optional[str] = None, max_tokens: int = 500,
+                   api_key: Optional[str] = None,
+                   timeout: Optional[float] = None,
+                   use_cache: bool = True) -> ChatResult:
+        """Run one chat completion, bounded by the global and provider limits
+
+        Identical (provider, model, messages, max_tokens) calls are served from
+        the response cache unless use_cache is False. model defaults to the
+        provider's own default model.
+        """
+        backend = self.providers.get(provider)
+        if backend is None:
+            raise LLMError(f"Unsupported LLM provider: {provider}")
+        model = model or backend.default_model
+
+        start = time.perf_counter()
+        key = None
+        if self.cache is not None and use_cache:
+            key = cache_key(provider, model, messages, max_tokens)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self._notify(provider, "cached", start)
+                return ChatResult(**cached, cached=True)
+
+        try:
+            async with self.semaphore, backend.semaphore:
+                result = await asyncio.wait_for(
+                    backend.chat(messages, model, max_tokens, api_key=api_key),
+                    timeout or self.timeout,
+                )
+        except asyncio.TimeoutError:
+            self._notify(provider, "timeout", start)
+            raise LLMError(f"{provider} completion timed out after {timeout or self.timeout}s")
+        except asyncio.CancelledError:
+            self._notify(provider, "cancelled", start)
+            raise
+        except Exception:
+            self._notify(provider, "error", start)
+            raise
+        self._notify(provider, "ok", start, result.usage)
+
+        if key is not None:
+            await self.cache.set(key, {
+                "content": result.content,
+                "provider": result.provider,
+                "model": result.model,
+                "usage": result.usage,
+            })
+        return result
+
+    async def stream_chat(self, messages: List[dict], provider: str = "openai",
+                          model: Optional[str] = None, max_tokens: int = 500,
+                          api_key: Optional[str] = None,
+                          timeout: Optional[float] = None,
+                          use_cache: bool = True) -> AsyncIterator[str]:
+        """Yield completion text chunks as the provider produces them
+
+        The timeout applies to the wait for each chunk, so long generations are
+        not cut off while they keep making progress. A cached response is
+        yielded as a single chunk.
+        """
+        backend = self.providers.get(provider)
+        if backend is None:
+            raise LLMError(f"Unsupported LLM provider: {provider}")
+        model = model or backend.default_model
+
+        start = time.perf_counter()
+        key = None
+        if self.cache is not None and use_cache:
+            key = cache_key(provider, model, messages, max_tokens)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                self._notify(provider, "cached", start)
+                yield cached["content"]
+                return
+
+        parts = []
+        usage: Dict[str, int] = {}
+        # Stays "cancelled" if the consumer stops reading or is cancelled mid-stream
+        outcome = "cancelled"
+        async with self.semaphore, backend.semaphore:
+            chunks = backend.stream_chat(messages, model, max_tokens, api_key=api_key, usage=usage)
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout or self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        outcome = "timeout"
+                        raise LLMError(f"{provider} stream stalled for {timeout or self.timeout}s")
+                    parts.append(chunk)
+                    yield chunk
+                outcome = "ok"
+            except Exception:
+                if outcome != "timeout":
+                    outcome = "error"
+                raise
+            finally:
+                await chunks.aclose()
+                self._notify(provider, outcome, start, usage)
+
+        if key is not None:
+            await self.cache.set(key, {
+                "content": "".join(parts),
+                "provider": provider,
+                "model": model,
+                "usage": usage,
+            })
+
+    async def aclose(self):
+        for backend in self.providers.values():
+            await backend.aclose()
+
+
+llm = LLMClient(cache=LLMCache() if LLM_CACHE_ENABLED else None)
+llm.register(OpenAIProvider())
+llm.register(AnthropicProvider())
+if AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_DEPLOYMENT:
+    llm.register(AzureOpenAIProvider())
+if LLM_ENABLE_STUB:
+    llm.register(StubProvider())
@@ -1,22 +1,24 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
 import sqlite3
 import json
 import tempfile
 import asyncio
+import time
 from datetime import datetime, timedelta
 from typing import List, Optional
 import openai
 import requests
+import httpx
 from gtts import gTTS
 import tempfile
 import re
 from dotenv import load_dotenv
 import firebase_admin
-from firebase_admin import credentials, auth as firebase_auth
+from firebase_admin import credentials
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import subprocess
@@ -26,6 +28,31 @@ import logging
 # Load environment variables
 load_dotenv()
 
+from db import db
+from llm_client import llm
+from batch_summarizer import summarize_items
+from speech import open_speech_stream, speech_cache, speech_key
+from uploads import spool_upload
+from workflow import Channel, Step, run_workflow
+from task_engine import task_engine, PRIORITY_HIGH, PRIORITY_NORMAL
+from browser_pool import (
+    browser_pool, extract_records, check_url, url_rejection, BrowserPoolError, BrowserLaunchError, BlockedURLError,
+)
+from permissions import role_cache, is_permitted
+from auth_cache import token_verifier
+from migrations import migrate
+from pagination import encode_cursor, decode_cursor, clamp_limit, stream_ndjson
+from activity_log import activity_log
+from reminder_scheduler import reminder_scheduler
+from intent_router import route
+from semantic_cache import semantic_cache
+from provider_router import provider_router
+from admission import AdmissionMiddleware, AdmissionRejected, admission_control
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, cache_collector, loop_lag_monitor,
+    observe_db, observe_llm, outbound_hooks, registry as metrics_registry,
+)
+
 # Initialize Firebase Admin (for user verification)
 # In production, use a proper service account key
 try:
@@ -45,11 +72,16 @@ try:
         
         if cred:
             firebase_admin.initialize_app(cred)
+            token_verifier.project_id = token_verifier.project_id or firebase_admin.get_app().project_id
 except Exception as e:
     print(f"Firebase Admin initialization skipped: {e}")
 
 app = FastAPI(title="AstraMind AI Agent - Phase 3", version="3.0.0")
 
+# Rate limits and a concurrency ceiling for the LLM-backed endpoints; added
+# before CORS so CORS wraps it and browsers can read its 429s
+app.add_middleware(AdmissionMiddleware, controller=admission_control)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +91,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, status and in-flight counts; added last so it is the
+# outermost layer and also times 429s and CORS preflights
+app.add_middleware(MetricsMiddleware)
+
 # Initialize API keys
 openai.api_key = os.getenv("OPENAI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
@@ -66,6 +102,30 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 AZURE_API_KEY = os.getenv("AZURE_API_KEY")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 
+# YouTube summary fan-out
+YT_SUMMARY_CONCURRENCY = int(os.getenv("YT_SUMMARY_CONCURRENCY", "5"))
+YT_SUMMARY_DEADLINE_SECONDS = float(os.getenv("YT_SUMMARY_DEADLINE_SECONDS", "20"))
+YT_SUMMARY_STALE_SECONDS = int(os.getenv("YT_SUMMARY_STALE_SECONDS", "86400"))
+
+# Emergency workflow deadlines
+EMERGENCY_DEADLINE_SECONDS = float(os.getenv("EMERGENCY_DEADLINE_SECONDS", "8"))
+EMERGENCY_API_TIMEOUT_SECONDS = float(os.getenv("EMERGENCY_API_TIMEOUT_SECONDS", "5"))
+EMERGENCY_NOTIFY_TIMEOUT_SECONDS = float(os.getenv("EMERGENCY_NOTIFY_TIMEOUT_SECONDS", "3"))
+
+# Shared async HTTP client for outbound API calls (keep-alive across requests)
+http_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0), event_hooks=outbound_hooks())
+
+# Timings for /metrics from the database pool and LLM client, plus cache hit ratios read at scrape time
+db.add_listener(observe_db)
+llm.add_listener(observe_llm)
+metrics_registry.add_collector(cache_collector({
+    "llm": lambda: llm.cache.stats() if llm.cache else None,
+    "tts": speech_cache.stats,
+    "semantic": lambda: semantic_cache.stats() if semantic_cache is not None else None,
+    "permission": role_cache.stats,
+    "token": token_verifier.stats,
+}))
+
 # User Authentication Functions
 async def verify_firebase_token(token: str):
     """Verify Firebase ID token and return user info"""
@@ -78,7 +138,8 @@ async def verify_firebase_token(token: str):
                 "name": "Demo User"
             }
         
-        decoded_token = firebase_auth.verify_id_token(token)
+        # Signature checked once per token, then served from cache until exp
+        decoded_token = await token_verifier.verify(token)
         return {
             "uid": decoded_token['uid'],
             "email": decoded_token.get('email'),
@@ -98,102 +159,44 @@ async def get_user_from_request(authorization: str = None):
     except:
         return None
 
-def check_user_permissions(user_id: str, operation: str) -> bool:
+admission_control.set_authenticator(get_user_from_request)
+
+async def check_user_permissions(user_id: str, operation: str) -> bool:
     """Check if user has permission for operation"""
     try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT role FROM user_profiles WHERE uid = ?', (user_id,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if not result:
-            return False
-        
-        user_role = result[0]
-        
-        # Admin can do everything
-        if user_role == 'admin':
-            return True
-        
-        # Regular users have limited permissions
-        restricted_ops = ['emergency', 'system', 'admin', 'configure']
-        return not any(op in operation.lower() for op in restricted_ops)
+        return is_permitted(await role_cache.get_role(user_id), operation)
     except:
         return False
 
 # Database initialization
-def init_db():
-    conn = sqlite3.connect('astramind.db')
-    cursor = conn.cursor()
-    
-    # Create tables
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS youtube_summaries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            topic TEXT NOT NULL,
-            video_id TEXT NOT NULL,
-            title TEXT NOT NULL,
-            summary TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS job_searches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            role TEXT NOT NULL,
-            location TEXT NOT NULL,
-            results TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task TEXT NOT NULL,
-            reminder_time TIMESTAMP NOT NULL,
-            status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            user_id TEXT,
-            FOREIGN KEY (user_id) REFERENCES user_profiles (uid)
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_profiles (
-            uid TEXT PRIMARY KEY,
-            email TEXT NOT NULL,
-            display_name TEXT NOT NULL,
-            role TEXT DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            task_count INTEGER DEFAULT 0,
-            plan TEXT DEFAULT 'free'
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS task_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT NOT NULL,
-            task_type TEXT NOT NULL,
-            command TEXT,
-            status TEXT NOT NULL,
-            details TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES user_profiles (uid)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+async def init_db():
+    db.open()
+    applied = await db.run(migrate)
+    if applied:
+        print(f"Applied database migrations: {applied}")
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await init_db()
+    speech_cache.load()
+    await activity_log.start()
+    await reminder_scheduler.start()
+    await task_engine.start()
+    await browser_pool.start()
+    await loop_lag_monitor.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await loop_lag_monitor.stop()
+    await task_engine.stop()
+    await reminder_scheduler.stop()
+    await activity_log.stop()
+    await browser_pool.stop()
+    await llm.aclose()
+    await token_verifier.keys.aclose()
+    await http_client.aclose()
+    db.close()
 
 # Models
 class ReminderRequest:
@@ -232,6 +235,11 @@ def extract_video_id(url: str) -> str:
 
 # API Endpoints
 
+def transcribe_audio_file(path: str) -> dict:
+    """Transcribe an audio file with OpenAI Whisper (blocking)"""
+    with open(path, "rb") as audio:
+        return openai.Audio.transcribe("whisper-1", audio)
+
 @app.post("/voice-input")
 async def voice_input(audio_file: UploadFile = File(...)):
     """Convert voice input to text using OpenAI Whisper"""
@@ -239,28 +247,83 @@ async def voice_input(audio_file: UploadFile = File(...)):
         if not openai.api_key:
             raise HTTPException(status_code=500, detail="OpenAI API key not configured")
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Transcribe using OpenAI Whisper
-        with open(temp_file_path, "rb") as audio:
-            transcript = openai.Audio.transcribe("whisper-1", audio)
-        
-        # Clean up temp file
-        os.unlink(temp_file_path)
+        # Spool the upload to disk in chunks (capped by VOICE_UPLOAD_MAX_BYTES)
+        temp_file_path = await spool_upload(audio_file, suffix=".wav")
+        try:
+            # Transcribe using OpenAI Whisper on a worker thread
+            loop = asyncio.get_running_loop()
+            transcript = await loop.run_in_executor(None, transcribe_audio_file, temp_file_path)
+        finally:
+            # Clean up temp file
+            os.unlink(temp_file_path)
         
         return {"text": transcript["text"], "language": transcript.get("language", "en")}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Voice transcription failed: {str(e)}")
 
+async def fetch_video_captions(item: dict, semaphore: asyncio.Semaphore) -> bool:
+    """Check that captions metadata is available for a search result"""
+    async with semaphore:
+        # Get video transcript
+        transcript_url = f"https://www.googleapis.com/youtube/v3/captions"
+        transcript_params = {
+            "part": "snippet",
+            "videoId": item["id"]["videoId"],
+            "key": YOUTUBE_API_KEY
+        }
+        
+        transcript_response = await http_client.get(transcript_url, params=transcript_params)
+        return transcript_response.status_code == 200
+
 @app.get("/yt-summary")
-async def youtube_summary(topic: str):
+async def youtube_summary(topic: str, no_cache: bool = False, refresh: bool = False, background: bool = False):
     """Fetch and summarize YouTube videos on a given topic"""
     try:
+        if background:
+            return await submit_background_task("yt-summary", {"topic": topic, "no_cache": no_cache, "refresh": refresh})
+        
+        topic_key = clean_text(topic).lower()
+        stale_window = f"-{YT_SUMMARY_STALE_SECONDS} seconds"
+        
+        # Serve the last complete search for this topic straight from the database,
+        # in YouTube's ranking order, while it and all of its summaries are fresh
+        fetch = None
+        if not refresh:
+            fetch = await db.fetchone('''
+                SELECT video_ids FROM youtube_topic_fetches
+                WHERE topic = ? AND fetched_at >= datetime('now', ?)
+            ''', (topic_key, stale_window))
+        if fetch:
+            video_ids = json.loads(fetch[0])
+            rows = await db.fetchall(f'''
+                SELECT video_id, title, summary FROM youtube_summaries
+                WHERE video_id IN ({", ".join("?" * len(video_ids))})
+                AND created_at >= datetime('now', ?)
+            ''', (*video_ids, stale_window)) if video_ids else []
+            stored = {row[0]: row for row in rows}
+            # Otherwise search again; summaries still fresh are reused below
+            if len(stored) == len(video_ids):
+                summaries = [
+                    {
+                        "video_id": video_id,
+                        "title": stored[video_id][1],
+                        "summary": stored[video_id][2],
+                        "url": f"https://www.youtube.com/watch?v={video_id}"
+                    }
+                    for video_id in video_ids
+                ]
+                return {
+                    "topic": topic,
+                    "summaries": summaries,
+                    "count": len(summaries),
+                    "partial": False,
+                    "failed_video_ids": [],
+                    "cached": True
+                }
+        
         if not YOUTUBE_API_KEY:
             raise HTTPException(status_code=500, detail="YouTube API key not configured")
         
@@ -275,75 +338,130 @@ async def youtube_summary(topic: str):
             "relevanceLanguage": "en"
         }
         
-        response = requests.get(search_url, params=search_params)
+        response = await http_client.get(search_url, params=search_params)
         response.raise_for_status()
         search_results = response.json()
+        results = search_results.get("items", [])
+        
+        # Reuse summaries of videos we have already seen; only new videos are summarized
+        known = {}
+        if results and not refresh:
+            video_ids = [item["id"]["videoId"] for item in results]
+            rows = await db.fetchall(f'''
+                SELECT video_id, title, summary FROM youtube_summaries
+                WHERE video_id IN ({", ".join("?" * len(video_ids))})
+                AND created_at >= datetime('now', ?)
+            ''', (*video_ids, stale_window))
+            known = {row[0]: {"title": row[1], "summary": row[2]} for row in rows}
+        items = [item for item in results if item["id"]["videoId"] not in known]
         
-        summaries = []
+        # Fetch captions for all videos concurrently; whatever finishes before the deadline is used
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + YT_SUMMARY_DEADLINE_SECONDS
+        semaphore = asyncio.Semaphore(YT_SUMMARY_CONCURRENCY)
+        tasks = [asyncio.create_task(fetch_video_captions(item, semaphore)) for item in items]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=YT_SUMMARY_DEADLINE_SECONDS)
+            for task in pending:
+                task.cancel()
         
-        for item in search_results.get("items", []):
+        available = []
+        failed = []
+        for item, task in zip(items, tasks):
             video_id = item["id"]["videoId"]
-            title = item["snippet"]["title"]
-            
+            if not task.done() or task.cancelled():
+                print(f"Error processing video {video_id}: deadline exceeded")
+                failed.append(video_id)
+            elif task.exception():
+                print(f"Error processing video {video_id}: {task.exception()}")
+                failed.append(video_id)
+            elif task.result():
+                available.append(item)
+        
+        # For demo purposes, we'll use the video description as fallback
+        # In production, you'd want to use youtube-transcript-api
+        descriptions = [item["snippet"]["description"][:1000] for item in available]
+        
+        # Generate all summaries in as few GPT round-trips as the token budget allows
+        if openai.api_key:
             try:
-                # Get video transcript
-                transcript_url = f"https://www.googleapis.com/youtube/v3/captions"
-                transcript_params = {
-                    "part": "snippet",
-                    "videoId": video_id,
-                    "key": YOUTUBE_API_KEY
-                }
-                
-                transcript_response = requests.get(transcript_url, params=transcript_params)
-                if transcript_response.status_code == 200:
-                    transcript_data = transcript_response.json()
-                    
-                    # For demo purposes, we'll use the video description as fallback
-                    # In production, you'd want to use youtube-transcript-api
-                    video_description = item["snippet"]["description"]
-                    
-                    # Generate summary using GPT-4
-                    if openai.api_key:
-                        summary_response = openai.ChatCompletion.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant that summarizes content concisely."},
-                                {"role": "user", "content": f"Summarize this YouTube video content in under 100 words: {video_description[:1000]}"}
-                            ],
-                            max_tokens=150
-                        )
-                        summary = summary_response.choices[0].message.content
-                    else:
-                        summary = f"Summary of {title}: {video_description[:200]}..."
-                    
-                    # Store in database
-                    conn = sqlite3.connect('astramind.db')
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT INTO youtube_summaries (topic, video_id, title, summary)
-                        VALUES (?, ?, ?, ?)
-                    ''', (topic, video_id, title, summary))
-                    conn.commit()
-                    conn.close()
-                    
-                    summaries.append({
-                        "video_id": video_id,
-                        "title": title,
-                        "summary": summary,
-                        "url": f"https://www.youtube.com/watch?v={video_id}"
-                    })
-                    
-            except Exception as e:
-                print(f"Error processing video {video_id}: {e}")
+                generated = await asyncio.wait_for(
+                    summarize_items(
+                        descriptions,
+                        instruction="Summarize this YouTube video content in under 100 words:",
+                        item_max_tokens=150,
+                        use_cache=not no_cache
+                    ),
+                    timeout=max(deadline - loop.time(), 0.1)
+                )
+            except asyncio.TimeoutError:
+                print(f"Error summarizing videos for {topic}: deadline exceeded")
+                generated = [None] * len(available)
+        else:
+            generated = [
+                f"Summary of {item['snippet']['title']}: {description[:200]}..."
+                for item, description in zip(available, descriptions)
+            ]
+        
+        for item, summary in zip(available, generated):
+            video_id = item["id"]["videoId"]
+            if summary is None:
+                failed.append(video_id)
                 continue
+            known[video_id] = {"title": item["snippet"]["title"], "summary": summary}
+        
+        # Keep YouTube's ranking order for both reused and new summaries
+        summaries = [
+            {
+                "video_id": item["id"]["videoId"],
+                "title": known[item["id"]["videoId"]]["title"],
+                "summary": known[item["id"]["videoId"]]["summary"],
+                "url": f"https://www.youtube.com/watch?v={item['id']['videoId']}"
+            }
+            for item in results if item["id"]["videoId"] in known
+        ]
+        
+        # Upsert the summaries and, when every video was summarized, the topic's
+        # ranked video list in a single transaction. A video keeps the topic it
+        # was first stored under; created_at only moves forward when the summary
+        # itself was regenerated
+        def store(conn):
+            conn.executemany('''
+                INSERT INTO youtube_summaries (topic, video_id, title, summary)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (video_id) DO UPDATE SET
+                    title = excluded.title,
+                    summary = excluded.summary,
+                    created_at = CASE WHEN youtube_summaries.summary = excluded.summary
+                                      THEN youtube_summaries.created_at
+                                      ELSE CURRENT_TIMESTAMP END
+            ''', [(topic_key, v["video_id"], v["title"], v["summary"]) for v in summaries])
+            if not failed:
+                conn.execute('''
+                    INSERT INTO youtube_topic_fetches (topic, video_ids) VALUES (?, ?)
+                    ON CONFLICT (topic) DO UPDATE SET
+                        video_ids = excluded.video_ids,
+                        fetched_at = CURRENT_TIMESTAMP
+                ''', (topic_key, json.dumps([v["video_id"] for v in summaries])))
+        
+        await db.run(store)
         
-        return {"topic": topic, "summaries": summaries, "count": len(summaries)}
+        return {
+            "topic": topic,
+            "summaries": summaries,
+            "count": len(summaries),
+            "partial": bool(failed),
+            "failed_video_ids": failed,
+            "cached": False
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"YouTube summary failed: {str(e)}")
 
 @app.get("/job-search")
-async def job_search(role: str, location: str):
+async def job_search(role: str, location: str, no_cache: bool = False):
     """Search for jobs and return summaries"""
     try:
         # For demo purposes, we'll return mock job data
@@ -373,34 +491,26 @@ async def job_search(role: str, location: str):
             }
         ]
         
-        # Generate AI summaries for each job
+        # Generate AI summaries for all jobs in a single batched request
         if openai.api_key:
-            for job in mock_jobs:
-                try:
-                    summary_response = openai.ChatCompletion.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant that summarizes job postings."},
-                            {"role": "user", "content": f"Summarize this job posting in 2-3 sentences: {job['title']} at {job['company']} in {job['location']}. {job['description']}"}
-                        ],
-                        max_tokens=100
-                    )
-                    job["ai_summary"] = summary_response.choices[0].message.content
-                except:
-                    job["ai_summary"] = job["description"]
+            summaries = await summarize_items(
+                [f"{job['title']} at {job['company']} in {job['location']}. {job['description']}" for job in mock_jobs],
+                instruction="Summarize this job posting in 2-3 sentences:",
+                item_max_tokens=100,
+                system_prompt="You are a helpful assistant that summarizes job postings.",
+                use_cache=not no_cache
+            )
+            for job, summary in zip(mock_jobs, summaries):
+                job["ai_summary"] = summary or job["description"]
         else:
             for job in mock_jobs:
                 job["ai_summary"] = job["description"]
         
         # Store in database
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        await db.execute('''
             INSERT INTO job_searches (role, location, results)
             VALUES (?, ?, ?)
         ''', (role, location, json.dumps(mock_jobs)))
-        conn.commit()
-        conn.close()
         
         return {"role": role, "location": location, "jobs": mock_jobs, "count": len(mock_jobs)}
     
@@ -416,125 +526,235 @@ async def create_reminder(task: str = Form(...), reminder_time: str = Form(...),
         reminder_datetime = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M")
         
         # Store in database
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        reminder_id = await db.execute('''
             INSERT INTO reminders (task, reminder_time, status)
             VALUES (?, ?, ?)
         ''', (task, reminder_datetime.isoformat(), 'pending'))
-        conn.commit()
-        conn.close()
+        reminder_scheduler.schedule(reminder_id, reminder_datetime.isoformat())
         
         return {
             "message": "Reminder created successfully",
             "task": task,
             "reminder_time": reminder_datetime.isoformat(),
-            "id": cursor.lastrowid
+            "id": reminder_id
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reminder creation failed: {str(e)}")
 
-@app.get("/reminders")
-async def get_reminders():
-    """Get all pending reminders"""
-    try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+async def notify_reminder(reminder: dict):
+    """Reminder hook: record the firing in the owner's task history"""
+    if reminder["user_id"]:
+        await activity_log.record(
+            reminder["user_id"], "reminder", reminder["task"], "fired",
+            json.dumps({"reminder_id": reminder["id"], "reminder_time": reminder["reminder_time"]})
+        )
+
+reminder_scheduler.add_listener(notify_reminder)
+
+async def fetch_pending_reminders(after: Optional[list], limit: int) -> list:
+    """One page of pending reminders in (reminder_time, id) order, after the given sort key"""
+    if after is None:
+        return await db.fetchall('''
             SELECT id, task, reminder_time, status, created_at
             FROM reminders
             WHERE status = 'pending'
-            ORDER BY reminder_time ASC
-        ''')
+            ORDER BY reminder_time ASC, id ASC
+            LIMIT ?
+        ''', (limit,))
+    return await db.fetchall('''
+        SELECT id, task, reminder_time, status, created_at
+        FROM reminders
+        WHERE status = 'pending' AND (reminder_time, id) > (?, ?)
+        ORDER BY reminder_time ASC, id ASC
+        LIMIT ?
+    ''', (*after, limit))
+
+def reminder_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "task": row[1],
+        "reminder_time": row[2],
+        "status": row[3],
+        "created_at": row[4]
+    }
+
+def reminder_sort_key(row) -> tuple:
+    return (row[2], row[0])
+
+@app.get("/reminders")
+async def get_reminders(limit: int = 100, cursor: str = None, stream: bool = False):
+    """Get pending reminders, soonest first
+
+    Pages are keyset-paginated: pass the returned next_cursor to get the next
+    page. stream=true returns every remaining reminder as NDJSON instead.
+    """
+    try:
+        after = decode_cursor(cursor, 2)
+        if stream:
+            return StreamingResponse(
+                stream_ndjson(fetch_pending_reminders, reminder_from_row, reminder_sort_key, after),
+                media_type="application/x-ndjson"
+            )
         
-        reminders = []
-        for row in cursor.fetchall():
-            reminders.append({
-                "id": row[0],
-                "task": row[1],
-                "reminder_time": row[2],
-                "status": row[3],
-                "created_at": row[4]
-            })
+        limit = clamp_limit(limit)
+        rows = await fetch_pending_reminders(after, limit)
+        reminders = [reminder_from_row(row) for row in rows]
+        next_cursor = encode_cursor(reminder_sort_key(rows[-1])) if len(rows) == limit else None
         
-        conn.close()
-        return {"reminders": reminders}
+        return {"reminders": reminders, "next_cursor": next_cursor}
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch reminders: {str(e)}")
 
 @app.get("/speak")
-async def text_to_speech(text: str, language: str = "en"):
-    """Convert text to speech using gTTS"""
+async def text_to_speech(request: Request, text: str, language: str = "en", slow: bool = False, stream: bool = False):
+    """Convert text to speech using gTTS (cached by text, language and speed)
+
+    With stream=true, sentences are synthesized in parallel and the MP3 is
+    streamed in order as each one completes, so playback can start early.
+    """
     try:
-        # Create temporary file for audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-            temp_file_path = temp_file.name
+        if stream:
+            return StreamingResponse(await open_speech_stream(text, language, slow), media_type="audio/mpeg")
         
-        # Generate speech
-        tts = gTTS(text=text, lang=language, slow=False)
-        tts.save(temp_file_path)
+        # The cache key is a hash of the synthesis inputs, so it doubles as a strong
+        # ETag; a matching If-None-Match is answered before any cache or gTTS work
+        etag = f'"{speech_key(text, language, slow)}"'
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+        
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        
+        _, audio_path = await speech_cache.get_or_synthesize(text, language, slow)
         
         # Return audio file
         return FileResponse(
-            temp_file_path,
+            audio_path,
             media_type="audio/mpeg",
             filename="speech.mp3",
-            headers={"Content-Disposition": "attachment; filename=speech.mp3"}
+            headers={**headers, "Content-Disposition": "attachment; filename=speech.mp3"}
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text-to-speech failed: {str(e)}")
 
+async def stream_llm_events(chunks, provider: str, start: Optional[float] = None):
+    """Encode streamed completion chunks as NDJSON events, ending with timing stats
+
+    start is the perf_counter() reading timings count from, when the request
+    began before the chunks were handed over.
+    """
+    start = time.perf_counter() if start is None else start
+    first_token = None
+    try:
+        async for chunk in chunks:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            yield json.dumps({"type": "token", "content": chunk}) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": f"LLM processing failed: {str(e)}"}) + "\n"
+        return
+    yield json.dumps({
+        "type": "done",
+        "provider": provider,
+        "time_to_first_token_ms": round(first_token * 1000, 1) if first_token is not None else None,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        "timestamp": datetime.now().isoformat()
+    }) + "\n"
+
+async def single_chunk(text: str):
+    yield text
+
 @app.post("/llm-process")
 async def llm_process(
     text: str = Form(...), 
     provider: str = Form("openai"),
-    api_key: str = Form(None)
+    api_key: str = Form(None),
+    no_cache: bool = Form(False),
+    stream: bool = Form(False)
 ):
-    """Process text using specified LLM provider"""
+    """Process text using specified LLM provider
+
+    With stream=true the response is NDJSON: one {"type": "token"} event per
+    chunk as it arrives, then a {"type": "done"} event with time-to-first-token.
+    provider=auto picks the fastest healthy configured provider, hedging slow
+    calls to the runner-up; the response names the provider that answered.
+    """
     try:
-        if provider == "openai":
+        result = None
+        request_kwargs = {}
+        messages = [
+            {"role": "system", "content": "You are AstraMind, a helpful AI assistant. Process the user's request and provide a clear, actionable response."},
+            {"role": "user", "content": text}
+        ]
+        
+        if provider == "auto":
+            if stream:
+                # The router waits for the first chunk, so time from before it starts racing
+                start = time.perf_counter()
+                routed_provider, chunks = await provider_router.open_stream(
+                    messages, max_tokens=500, use_cache=not no_cache
+                )
+                return StreamingResponse(
+                    stream_llm_events(chunks, routed_provider, start), media_type="application/x-ndjson"
+                )
+            
+            response = await provider_router.chat(messages, max_tokens=500, use_cache=not no_cache)
+            return {
+                "provider": response.provider,
+                "response": response.content,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        elif provider == "openai":
             # Use provided API key if available, otherwise fallback to environment
             current_api_key = api_key if api_key else openai.api_key
             if not current_api_key:
                 raise HTTPException(status_code=400, detail="OpenAI API key required")
             
-            # Temporarily set the API key for this request
-            original_key = openai.api_key
-            openai.api_key = current_api_key
-            
-            try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are AstraMind, a helpful AI assistant. Process the user's request and provide a clear, actionable response."},
-                        {"role": "user", "content": text}
-                    ],
-                    max_tokens=500
-                )
-                result = response.choices[0].message.content
-            finally:
-                openai.api_key = original_key
+            # The key is passed per request, so concurrent callers never share it
+            request_kwargs = {
+                "model": "gpt-4o-mini",
+                "messages": messages,
+                "api_key": current_api_key
+            }
                 
         elif provider == "anthropic":
             if not api_key and not ANTHROPIC_API_KEY:
                 raise HTTPException(status_code=400, detail="Anthropic API key required")
             
-            # For demo purposes, simulate Anthropic response
-            result = f"[ANTHROPIC SIMULATION] Processed: {text[:100]}... Response would be generated using Claude API."
+            request_kwargs = {"messages": messages, "api_key": api_key}
             
         elif provider == "azure":
             if not api_key and not AZURE_API_KEY:
                 raise HTTPException(status_code=400, detail="Azure API key required")
             
-            # For demo purposes, simulate Azure OpenAI response
-            result = f"[AZURE SIMULATION] Processed: {text[:100]}... Response would be generated using Azure OpenAI."
+            if llm.has_provider("azure"):
+                request_kwargs = {"messages": messages, "api_key": api_key}
+            else:
+                # No AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_DEPLOYMENT configured: simulate the response
+                result = f"[AZURE SIMULATION] Processed: {text[:100]}... Response would be generated using Azure OpenAI."
+            
+        elif provider == "stub" and llm.has_provider("stub"):
+            # Local stub provider for offline load testing (LLM_ENABLE_STUB=true)
+            request_kwargs = {"messages": [{"role": "user", "content": text}]}
             
         else:
             raise HTTPException(status_code=400, detail="Unsupported LLM provider")
         
+        if stream:
+            chunks = single_chunk(result) if result is not None else llm.stream_chat(
+                provider=provider, max_tokens=500, use_cache=not no_cache, **request_kwargs
+            )
+            return StreamingResponse(stream_llm_events(chunks, provider), media_type="application/x-ndjson")
+        
+        if result is None:
+            response = await llm.chat(provider=provider, max_tokens=500, use_cache=not no_cache, **request_kwargs)
+            result = response.content
+        
         return {
             "provider": provider,
             "response": result,
@@ -553,23 +773,24 @@ async def user_register(
 ):
     """Register a new user profile"""
     try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
+        def register(conn: sqlite3.Connection) -> bool:
+            cursor = conn.cursor()
+            
+            # Check if user already exists
+            cursor.execute('SELECT uid FROM user_profiles WHERE uid = ?', (uid,))
+            if cursor.fetchone():
+                return False
+            
+            # Insert new user
+            cursor.execute('''
+                INSERT INTO user_profiles (uid, email, display_name, role, created_at, last_login_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (uid, email, display_name, role, datetime.now().isoformat(), datetime.now().isoformat()))
+            return True
         
-        # Check if user already exists
-        cursor.execute('SELECT uid FROM user_profiles WHERE uid = ?', (uid,))
-        if cursor.fetchone():
-            conn.close()
+        if not await db.run(register):
             return {"message": "User already exists", "uid": uid}
-        
-        # Insert new user
-        cursor.execute('''
-            INSERT INTO user_profiles (uid, email, display_name, role, created_at, last_login_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (uid, email, display_name, role, datetime.now().isoformat(), datetime.now().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        role_cache.invalidate(uid)
         
         return {
             "message": "User registered successfully",
@@ -581,47 +802,44 @@ async def user_register(
 
 @app.post("/task-execute")
 async def task_execute(
+    request: Request,
     command: str = Form(...),
     provider: str = Form("openai"),
     api_key: str = Form(None),
-    user_id: str = Form(None)
+    user_id: str = Form(None),
+    no_cache: bool = Form(False),
+    stream: bool = Form(False)
 ):
     """Execute a task based on voice command"""
     try:
         # Check user permissions if user_id provided
         if user_id:
-            if not check_user_permissions(user_id, command):
+            if not await check_user_permissions(user_id, command):
                 raise HTTPException(status_code=403, detail="Permission denied for this operation")
         
-        command_lower = command.lower()
+        # Compiled local routing; only low-confidence commands go to the LLM
+        routed = route(command)
+        intent = routed.intent if routed.local else None
+        routing = {"intent": intent or "llm", "confidence": routed.confidence}
         
-        # Log task attempt
+        # Log task attempt (buffered, written in the next batch)
         if user_id:
-            conn = sqlite3.connect('astramind.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO task_history (user_id, task_type, command, status, details)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, 'task-execute', command, 'pending', json.dumps({"provider": provider})))
-            conn.commit()
-            conn.close()
+            await activity_log.record(user_id, 'task-execute', command, 'pending', json.dumps({"provider": provider}))
         
-        if "reminder" in command_lower or "remind" in command_lower:
-            # Extract reminder text and create a mock reminder
-            reminder_text = command.replace("remind", "").replace("reminder", "").replace("me", "").replace("to", "").strip()
+        if intent == "reminder":
+            reminder_text = routed.slots["task"]
             
-            # Create reminder with current time + 1 hour
-            reminder_time = datetime.now() + timedelta(hours=1)
+            # Use the spoken time, or current time + 1 hour
+            if "time" in routed.slots:
+                reminder_time = datetime.fromisoformat(routed.slots["time"])
+            else:
+                reminder_time = datetime.now() + timedelta(hours=1)
             
-            conn = sqlite3.connect('astramind.db')
-            cursor = conn.cursor()
-            cursor.execute('''
+            reminder_id = await db.execute('''
                 INSERT INTO reminders (task, reminder_time, status, user_id)
                 VALUES (?, ?, ?, ?)
             ''', (reminder_text, reminder_time.isoformat(), 'pending', user_id))
-            conn.commit()
-            reminder_id = cursor.lastrowid
-            conn.close()
+            reminder_scheduler.schedule(reminder_id, reminder_time.isoformat())
             
             return {
                 "task_type": "reminder",
@@ -631,42 +849,135 @@ async def task_execute(
                     "task": reminder_text,
                     "reminder_time": reminder_time.isoformat()
                 },
-                "message": f"✅ Reminder created: '{reminder_text}' for {reminder_time.strftime('%Y-%m-%d %H:%M')}"
+                "message": f"✅ Reminder created: '{reminder_text}' for {reminder_time.strftime('%Y-%m-%d %H:%M')}",
+                "routing": routing
             }
             
-        elif "whatsapp" in command_lower or "message" in command_lower:
-            # Simulate WhatsApp message sending
-            message_content = "Hello! This is a simulated message from AstraMind AI."
+        elif intent == "message":
+            # Simulate message sending
+            message_content = routed.slots.get("content", "Hello! This is a simulated message from AstraMind AI.")
+            recipient = routed.slots.get("recipient", "primary_contact")
+            platform = routed.slots.get("platform", "whatsapp")
             
             return {
-                "task_type": "whatsapp",
+                "task_type": platform,
                 "action": "sent",
                 "details": {
                     "message": message_content,
-                    "recipient": "primary_contact",
-                    "platform": "whatsapp"
+                    "recipient": recipient,
+                    "platform": platform
                 },
-                "message": f"✅ Mock WhatsApp message sent: '{message_content}'"
+                "message": f"✅ Mock {'WhatsApp' if platform == 'whatsapp' else 'SMS'} message sent to {recipient}: '{message_content}'",
+                "routing": routing
+            }
+            
+        elif intent == "job_search":
+            jobs = await job_search(role=routed.slots["role"], location=routed.slots.get("location", ""), no_cache=no_cache)
+            
+            return {
+                "task_type": "job_search",
+                "action": "searched",
+                "details": jobs,
+                "message": f"✅ Found {jobs['count']} {routed.slots['role']} jobs",
+                "routing": routing
             }
             
+        elif intent == "youtube_summary":
+            # The fan-out costs what a /yt-summary call does
+            charge = getattr(request.state, "admission", None)
+            if charge is not None:
+                try:
+                    admission_control.reroute(charge, "/yt-summary")
+                except AdmissionRejected as e:
+                    raise HTTPException(status_code=429, detail=e.detail,
+                                        headers={"Retry-After": str(e.retry_after)})
+            try:
+                summaries = await youtube_summary(topic=routed.slots["topic"], no_cache=no_cache, refresh=False, background=False)
+            except HTTPException as e:
+                # YouTube unavailable (no API key, API error): let the LLM interpret the command instead
+                print(f"Local youtube_summary unavailable, falling back to LLM: {e.detail}")
+                summaries = None
+                routing["intent"] = "llm"
+            
+            if summaries is not None:
+                return {
+                    "task_type": "youtube_summary",
+                    "action": "summarized",
+                    "details": summaries,
+                    "message": f"✅ Summarized {summaries['count']} videos about '{routed.slots['topic']}'",
+                    "routing": routing
+                }
+            
+        # Near-duplicates of the same user's earlier commands reuse the earlier answer;
+        # anonymous commands are never shared
+        semantic_scope = f"{provider}:{user_id}" if semantic_cache is not None and user_id and not no_cache else None
+        cached = semantic_cache.get(semantic_scope, command) if semantic_scope else None
+        semantic_hit = {"similarity": cached["similarity"]} if cached else None
+        
+        if stream:
+            # Stream the interpretation as NDJSON, led by a meta event describing the task
+            if cached:
+                llm_events = stream_llm_events(single_chunk(cached["response"]), provider)
+            else:
+                llm_stream = await llm_process(
+                    text=f"Interpret this command and suggest an appropriate action: {command}",
+                    provider=provider,
+                    api_key=api_key,
+                    no_cache=no_cache,
+                    stream=True
+                )
+                llm_events = llm_stream.body_iterator
+            
+            async def interpretation_events():
+                yield json.dumps({
+                    "type": "meta",
+                    "task_type": "interpretation",
+                    "action": "analyzed",
+                    "original_command": command,
+                    "semantic_cache": semantic_hit
+                }) + "\n"
+                parts = []
+                async for line in llm_events:
+                    yield line
+                    if cached or not semantic_scope:
+                        continue
+                    event = json.loads(line)
+                    if event["type"] == "token":
+                        parts.append(event["content"])
+                    elif event["type"] == "done":
+                        semantic_cache.set(semantic_scope, command, "".join(parts))
+            
+            return StreamingResponse(interpretation_events(), media_type="application/x-ndjson")
+            
+        if cached:
+            response_text = cached["response"]
         else:
             # Use LLM to interpret and respond to the command
             llm_response = await llm_process(
                 text=f"Interpret this command and suggest an appropriate action: {command}",
                 provider=provider,
-                api_key=api_key
+                api_key=api_key,
+                no_cache=no_cache,
+                stream=False
             )
-            
-            return {
-                "task_type": "interpretation",
-                "action": "analyzed",
-                "details": {
-                    "original_command": command,
-                    "llm_response": llm_response["response"]
-                },
-                "message": "Command interpreted by AI"
-            }
+            response_text = llm_response["response"]
+            if semantic_scope:
+                semantic_cache.set(semantic_scope, command, response_text)
+        
+        return {
+            "task_type": "interpretation",
+            "action": "analyzed",
+            "details": {
+                "original_command": command,
+                "llm_response": response_text,
+                "semantic_cache": semantic_hit
+            },
+            "message": "Command interpreted by AI",
+            "routing": routing
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Task execution failed: {str(e)}")
 
@@ -674,16 +985,11 @@ async def task_execute(
 async def get_user_profile(user_id: str):
     """Get user profile information"""
     try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+        result = await db.fetchone('''
             SELECT uid, email, display_name, role, created_at, last_login_at, task_count, plan
             FROM user_profiles WHERE uid = ?
         ''', (user_id,))
         
-        result = cursor.fetchone()
-        conn.close()
-        
         if not result:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -700,35 +1006,64 @@ async def get_user_profile(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user profile: {str(e)}")
 
-@app.get("/user-tasks/{user_id}")
-async def get_user_task_history(user_id: str, limit: int = 50):
-    """Get user task history"""
-    try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
+async def fetch_user_tasks(user_id: str, after: Optional[list], limit: int) -> list:
+    """One page of a user's history in (timestamp, id) descending order, after the given sort key"""
+    if after is None:
+        return await db.fetchall('''
             SELECT id, task_type, command, status, details, timestamp
             FROM task_history 
             WHERE user_id = ?
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, id DESC
             LIMIT ?
         ''', (user_id, limit))
+    return await db.fetchall('''
+        SELECT id, task_type, command, status, details, timestamp
+        FROM task_history 
+        WHERE user_id = ? AND (timestamp, id) < (?, ?)
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    ''', (user_id, *after, limit))
+
+def task_from_row(row) -> dict:
+    return {
+        "id": row[0],
+        "taskType": row[1],
+        "command": row[2],
+        "status": row[3],
+        "details": json.loads(row[4]) if row[4] else {},
+        "timestamp": row[5]
+    }
+
+def task_sort_key(row) -> tuple:
+    return (row[5], row[0])
+
+@app.get("/user-tasks/{user_id}")
+async def get_user_task_history(user_id: str, limit: int = 50, cursor: str = None, stream: bool = False):
+    """Get user task history, newest first
+
+    Pages are keyset-paginated: pass the returned next_cursor to get older
+    entries. stream=true returns the whole remaining history as NDJSON.
+    """
+    try:
+        after = decode_cursor(cursor, 2)
         
-        results = cursor.fetchall()
-        conn.close()
+        async def fetch_page(after: Optional[list], limit: int) -> list:
+            return await fetch_user_tasks(user_id, after, limit)
         
-        tasks = []
-        for row in results:
-            tasks.append({
-                "id": row[0],
-                "taskType": row[1],
-                "command": row[2],
-                "status": row[3],
-                "details": json.loads(row[4]) if row[4] else {},
-                "timestamp": row[5]
-            })
+        if stream:
+            return StreamingResponse(
+                stream_ndjson(fetch_page, task_from_row, task_sort_key, after),
+                media_type="application/x-ndjson"
+            )
         
-        return {"tasks": tasks, "count": len(tasks)}
+        limit = clamp_limit(limit)
+        rows = await fetch_page(after, limit)
+        tasks = [task_from_row(row) for row in rows]
+        next_cursor = encode_cursor(task_sort_key(rows[-1])) if len(rows) == limit else None
+        
+        return {"tasks": tasks, "count": len(tasks), "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get task history: {str(e)}")
 
@@ -738,35 +1073,44 @@ async def log_user_activity(
     task_type: str = Form(...),
     status: str = Form(...),
     command: str = Form(None),
-    details: str = Form("{}")
+    details: str = Form("{}"),
+    durable: bool = Form(None)
 ):
-    """Log user activity"""
+    """Log user activity
+
+    The row and the task_count increment are buffered and committed in batches;
+    durable=true waits for the commit (ACTIVITY_LOG_DURABLE sets the default).
+    """
     try:
-        conn = sqlite3.connect('astramind.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO task_history (user_id, task_type, command, status, details)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, task_type, command, status, details))
-        
-        # Update user task count
-        cursor.execute('''
-            UPDATE user_profiles 
-            SET task_count = task_count + 1 
-            WHERE uid = ?
-        ''', (user_id,))
+        history_id = await activity_log.record(user_id, task_type, command, status, details,
+                                               count_task=True, durable=durable)
         
-        conn.commit()
-        conn.close()
-        
-        return {"message": "Activity logged successfully"}
+        return {"message": "Activity logged successfully", "id": history_id, "queued": history_id is None}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to log activity: {str(e)}")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "llm_cache": llm.cache.stats() if llm.cache else None,
+        "tts_cache": speech_cache.stats(),
+        "browser_pool": browser_pool.stats(),
+        "permission_cache": role_cache.stats(),
+        "token_cache": token_verifier.stats(),
+        "activity_log": activity_log.stats(),
+        "reminders": reminder_scheduler.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "llm_router": provider_router.stats(),
+        "admission": admission_control.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.post("/browser-automation")
 async def browser_automation(
@@ -774,29 +1118,128 @@ async def browser_automation(
     target_url: str = Form(""),
     user_id: str = Form(None),
     automation_script: str = Form(""),
-    options: str = Form("{}")
+    options: str = Form("{}"),
+    background: bool = Form(False)
 ):
     """Execute browser automation tasks using Playwright"""
     try:
-        if user_id and not check_user_permissions(user_id, "browser-automation"):
+        if user_id and not await check_user_permissions(user_id, "browser-automation"):
             raise HTTPException(status_code=403, detail="Permission denied for browser automation")
 
         # Parse options
         automation_options = json.loads(options) if options else {}
         
-        # Simulate browser automation (in production, use actual Playwright)
-        if task_type == "job-search":
-            return await simulate_job_search_automation(target_url, automation_options)
-        elif task_type == "form-filling":
-            return await simulate_form_automation(target_url, automation_options)
-        elif task_type == "data-extraction":
-            return await simulate_data_extraction(target_url, automation_options)
-        else:
+        if task_type not in BROWSER_AUTOMATIONS:
             raise HTTPException(status_code=400, detail="Unsupported automation task type")
+        
+        rejection = url_rejection(target_url) if target_url else None
+        if rejection:
+            raise HTTPException(status_code=400, detail=f"URL not allowed: {rejection}")
+        
+        if background:
+            return await submit_background_task(
+                "browser-automation",
+                {"task_type": task_type, "target_url": target_url, "options": automation_options},
+                user_id=user_id
+            )
+        
+        return await run_browser_automation(task_type, target_url, automation_options)
             
+    except HTTPException:
+        raise
+    except BlockedURLError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except BrowserPoolError as e:
+        raise HTTPException(status_code=503, detail=f"Browser automation unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Browser automation failed: {str(e)}")
 
+async def run_browser_automation(task_type: str, url: str, options: dict):
+    """Drive a pooled Playwright page against url, or return simulated results without one"""
+    if not url or not browser_pool.available:
+        return await SIMULATED_AUTOMATIONS[task_type](url, options)
+    
+    started = time.perf_counter()
+    try:
+        async with browser_pool.page() as page:
+            await check_url(url)
+            await page.goto(url, wait_until="domcontentloaded")
+            result = await BROWSER_AUTOMATIONS[task_type](page, options)
+            final_url = page.url
+    except BrowserLaunchError as e:
+        # Playwright is installed but Chromium is not usable here
+        print(f"Browser automation falling back to simulation: {e}")
+        return await SIMULATED_AUTOMATIONS[task_type](url, options)
+    result["metadata"].update(
+        target_url=url,
+        final_url=final_url,
+        execution_time=f"{time.perf_counter() - started:.1f}s",
+        browser_used="Chromium"
+    )
+    return result
+
+async def automate_job_search(page, options: dict):
+    """Collect job listings; selectors default to .job cards with title/company/location/salary/link"""
+    fields = options.get("fields") or {
+        "title": ".title",
+        "company": ".company",
+        "location": ".location",
+        "salary": ".salary",
+        "apply_url": "a@href"
+    }
+    jobs = await extract_records(page, options.get("item_selector", ".job"), fields)
+    
+    return {
+        "task_type": "job-search-automation",
+        "status": "completed",
+        "results": jobs,
+        "metadata": {
+            "total_jobs_found": len(jobs),
+            "search_criteria": options.get("criteria", {})
+        }
+    }
+
+async def automate_form_filling(page, options: dict):
+    """Fill options["fields"] ({selector: value}) and click options["submit_selector"] if given"""
+    fields = options.get("fields", {})
+    for selector, value in fields.items():
+        await page.fill(selector, str(value))
+    
+    submitted = False
+    if options.get("submit_selector"):
+        await page.click(options["submit_selector"])
+        await page.wait_for_load_state("domcontentloaded")
+        submitted = True
+    
+    return {
+        "task_type": "form-automation",
+        "status": "completed",
+        "results": {
+            "forms_filled": 1 if fields else 0,
+            "fields_completed": len(fields),
+            "submitted": submitted
+        },
+        "metadata": {}
+    }
+
+async def automate_data_extraction(page, options: dict):
+    """Extract text (or per-field records) from every element matching options["selector"]"""
+    records = await extract_records(page, options.get("selector", "body"), options.get("fields"))
+    
+    return {
+        "task_type": "data-extraction",
+        "status": "completed",
+        "results": {
+            "records_extracted": len(records),
+            "records": records,
+            "page_title": await page.title(),
+            "format": "JSON"
+        },
+        "metadata": {
+            "extraction_method": "CSS Selectors"
+        }
+    }
+
 async def simulate_job_search_automation(url: str, options: dict):
     """Simulate job search automation"""
     await asyncio.sleep(2)  # Simulate processing time
@@ -880,52 +1323,103 @@ async def simulate_data_extraction(url: str, options: dict):
         }
     }
 
+async def record_emergency_outcome(log_task: asyncio.Task, outcome: dict):
+    """Wait for the emergency's task_history insert, then store the outcome on that row"""
+    try:
+        history_id = await log_task
+        if history_id is not None:
+            await db.execute('''
+                UPDATE task_history SET status = ?, details = ? WHERE id = ?
+            ''', (outcome["status"], json.dumps(outcome["details"]), history_id))
+    except Exception as e:
+        # The emergency itself must not fail because its log entry could not be written
+        print(f"Failed to record emergency outcome: {e}")
+
 @app.post("/emergency-protocol")
 async def emergency_protocol(
     emergency_type: str = Form(...),
     user_location: str = Form(""),
     user_id: str = Form(None),
-    contact_info: str = Form("{}")
+    contact_info: str = Form("{}"),
+    background: bool = Form(False)
 ):
-    """Execute emergency protocol with fallback chain"""
+    """Execute emergency protocol with fallback chain
+    
+    Emergency services, contact messaging and email run concurrently; WhatsApp
+    is only tried if SMS fails or times out. Each step has its own timeout and
+    the whole workflow is bounded by EMERGENCY_DEADLINE_SECONDS.
+    """
     try:
+        if background:
+            # Emergency jobs jump ahead of everything else in the queue
+            return await submit_background_task(
+                "emergency-protocol",
+                {"emergency_type": emergency_type, "user_location": user_location,
+                 "user_id": user_id, "contact_info": contact_info},
+                user_id=user_id,
+                priority=PRIORITY_HIGH
+            )
+        
         contacts = json.loads(contact_info) if contact_info else {}
         
-        # Log emergency request
+        # Log emergency request without delaying the workflow itself
+        log_task = None
         if user_id:
-            conn = sqlite3.connect('astramind.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO task_history (user_id, task_type, command, status, details)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, 'emergency-protocol', emergency_type, 'initiated', 
-                  json.dumps({"location": user_location, "contacts": contacts})))
-            conn.commit()
-            conn.close()
-        
-        # Simulate emergency workflow execution
-        workflow_results = []
-        
-        # Step 1: Emergency API Call
-        api_result = await simulate_emergency_api_call(emergency_type, user_location)
-        workflow_results.append(api_result)
-        
-        # Step 2: SMS Fallback
-        sms_result = await simulate_sms_notification(emergency_type, contacts)
-        workflow_results.append(sms_result)
+            log_task = asyncio.create_task(activity_log.record(
+                user_id, 'emergency-protocol', emergency_type, 'initiated',
+                json.dumps({"location": user_location, "contacts": contacts}),
+                durable=True
+            ))
+        outcome = {"status": "failed", "details": {"location": user_location, "contacts": contacts}}
         
-        # Step 3: WhatsApp Backup
-        whatsapp_result = await simulate_whatsapp_notification(emergency_type, contacts)
-        workflow_results.append(whatsapp_result)
-        
-        # Step 4: Email Notification
-        email_result = await simulate_email_notification(emergency_type, contacts)
-        workflow_results.append(email_result)
+        try:
+            channels = [
+                Channel("emergency_services", [
+                    Step("emergency_api_call", lambda: simulate_emergency_api_call(emergency_type, user_location), EMERGENCY_API_TIMEOUT_SECONDS)
+                ]),
+                Channel("contact_messaging", [
+                    Step("sms_notification", lambda: simulate_sms_notification(emergency_type, contacts), EMERGENCY_NOTIFY_TIMEOUT_SECONDS),
+                    Step("whatsapp_notification", lambda: simulate_whatsapp_notification(emergency_type, contacts), EMERGENCY_NOTIFY_TIMEOUT_SECONDS)
+                ]),
+                Channel("email", [
+                    Step("email_notification", lambda: simulate_email_notification(emergency_type, contacts), EMERGENCY_NOTIFY_TIMEOUT_SECONDS)
+                ])
+            ]
+            workflow = await run_workflow(channels, deadline=EMERGENCY_DEADLINE_SECONDS)
+            
+            workflow_results = [
+                attempt["result"] or {
+                    "step": attempt["step"],
+                    "status": attempt["status"],
+                    "details": {"error": attempt.get("error")}
+                }
+                for attempt in workflow["attempts"]
+            ]
+            step_timings = [
+                {key: attempt.get(key) for key in ("channel", "step", "status", "started_ms", "duration_ms")}
+                for attempt in workflow["attempts"]
+            ]
+            outcome["status"] = workflow["status"]
+            outcome["details"].update(
+                channels=workflow["channels"],
+                step_timings=step_timings,
+                duration_ms=workflow["duration_ms"]
+            )
+        except Exception as e:
+            outcome["details"]["error"] = str(e)
+            raise
+        finally:
+            # Record the outcome and per-step timings on the task_history row, once it exists
+            if log_task:
+                await record_emergency_outcome(log_task, outcome)
         
         return {
             "emergency_type": emergency_type,
-            "status": "completed",
+            "status": workflow["status"],
             "workflow_results": workflow_results,
+            "channels": workflow["channels"],
+            "step_timings": step_timings,
+            "duration_ms": workflow["duration_ms"],
             "reference_id": f"EMG-{int(datetime.now().timestamp())}",
             "timestamp": datetime.now().isoformat()
         }
@@ -933,6 +1427,19 @@ async def emergency_protocol(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Emergency protocol failed: {str(e)}")
 
+BROWSER_AUTOMATIONS = {
+    "job-search": automate_job_search,
+    "form-filling": automate_form_filling,
+    "data-extraction": automate_data_extraction
+}
+
+# Demo results when no target URL is given or Playwright is unavailable
+SIMULATED_AUTOMATIONS = {
+    "job-search": simulate_job_search_automation,
+    "form-filling": simulate_form_automation,
+    "data-extraction": simulate_data_extraction
+}
+
 async def simulate_emergency_api_call(emergency_type: str, location: str):
     """Simulate emergency services API call"""
     await asyncio.sleep(1.5)
@@ -1008,49 +1515,118 @@ async def simulate_email_notification(emergency_type: str, contacts: dict):
 async def get_task_status(task_id: str):
     """Get real-time task status and progress"""
     try:
-        # In production, this would query a task queue (Redis/Celery)
-        # For demo, return simulated status
+        status = await task_engine.get(task_id)
         
-        mock_statuses = {
-            "job-search-automation": {
-                "status": "running",
-                "progress": 65,
-                "current_operation": "Processing LinkedIn results...",
-                "logs": [
-                    "Task initiated",
-                    "Browser launched",
-                    "Navigating to LinkedIn",
-                    "Extracting job listings",
-                    "Processing results..."
-                ],
-                "eta_seconds": 45
-            },
-            "browser-automation": {
-                "status": "completed",
-                "progress": 100,
-                "current_operation": "Task completed successfully",
-                "logs": [
-                    "Task initiated",
-                    "Browser launched",
-                    "Forms filled",
-                    "Data extracted",
-                    "Task completed"
-                ],
+        if status is None:
+            return {
+                "task_id": task_id,
+                "status": "not_found",
+                "progress": 0,
+                "current_operation": "Task not found",
+                "logs": [],
                 "eta_seconds": 0
             }
-        }
-        
-        return mock_statuses.get(task_id, {
-            "status": "not_found",
-            "progress": 0,
-            "current_operation": "Task not found",
-            "logs": [],
-            "eta_seconds": 0
-        })
+        return status
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get task status: {str(e)}")
 
+@app.post("/task-cancel/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running background task"""
+    try:
+        cancelled = await task_engine.cancel(task_id)
+        return {"task_id": task_id, "cancelled": cancelled}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to cancel task: {str(e)}")
+
+@app.websocket("/ws/tasks")
+async def task_updates(websocket: WebSocket, task_ids: str = ""):
+    """Push task progress, log lines and completion to the client as they happen
+
+    Subscribe with ?task_ids=a,b or by sending {"action": "subscribe"|"unsubscribe",
+    "task_ids": [...]}. Each subscribed task starts with a snapshot event.
+    """
+    await websocket.accept()
+    subscription = task_engine.subscribe()
+
+    async def send_snapshots(ids):
+        subscription.add(ids)
+        for task_id in ids:
+            snapshot = await task_engine.snapshot(task_id)
+            await websocket.send_json(snapshot or {"type": "not_found", "task_id": task_id})
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            ids = [str(task_id) for task_id in message.get("task_ids", [])]
+            if message.get("action") == "unsubscribe":
+                subscription.remove(ids)
+            else:
+                await send_snapshots(ids)
+
+    async def send_events():
+        while True:
+            for event in await subscription.next_events():
+                await websocket.send_json(event)
+
+    reader = writer = None
+    try:
+        await send_snapshots([task_id for task_id in task_ids.split(",") if task_id])
+        reader = asyncio.create_task(receive_commands())
+        writer = asyncio.create_task(send_events())
+        done, _ = await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+        for task in (reader, writer):
+            if task is not None:
+                task.cancel()
+
+# Background task handlers
+async def submit_background_task(task_type: str, params: dict, user_id: str = None, priority: int = PRIORITY_NORMAL):
+    """Queue a job on the task engine and answer 202 with its id"""
+    task_id = await task_engine.submit(task_type, params, user_id=user_id, priority=priority)
+    return JSONResponse(status_code=202, content={
+        "task_id": task_id,
+        "status": "queued",
+        "status_url": f"/task-status/{task_id}",
+        "events_url": f"/ws/tasks?task_ids={task_id}"
+    })
+
+async def browser_automation_job(ctx, task_type: str, target_url: str, options: dict):
+    await ctx.progress(10, "Waiting for a browser")
+    await ctx.log(f"Running {task_type} automation on {target_url or 'default target'}")
+    result = await run_browser_automation(task_type, target_url, options)
+    await ctx.progress(95, "Collecting results")
+    return result
+
+async def youtube_summary_job(ctx, topic: str, no_cache: bool, refresh: bool):
+    await ctx.progress(10, f"Searching YouTube for '{topic}'")
+    result = await youtube_summary(topic, no_cache=no_cache, refresh=refresh, background=False)
+    await ctx.log(f"Summarized {result['count']} videos")
+    return result
+
+async def emergency_protocol_job(ctx, emergency_type: str, user_location: str, user_id: str, contact_info: str):
+    await ctx.progress(5, "Contacting emergency services and notifying contacts")
+    result = await emergency_protocol(
+        emergency_type=emergency_type,
+        user_location=user_location,
+        user_id=user_id,
+        contact_info=contact_info,
+        background=False
+    )
+    for channel, status in result["channels"].items():
+        await ctx.log(f"{channel}: {status}")
+    return result
+
+task_engine.register("browser-automation", browser_automation_job)
+task_engine.register("yt-summary", youtube_summary_job, idempotent=True)
+task_engine.register("emergency-protocol", emergency_protocol_job)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -0,0 +1,318 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from starlette.routing import Match
+
+# Prometheus metrics for /metrics (text exposition format 0.0.4).
+# Counters, gauges and histograms are kept in process and rendered on scrape;
+# they are fed by MetricsMiddleware (per-route latency and in-flight counts),
+# listeners on the database pool and LLM client, httpx event hooks on the
+# shared outbound client (YouTube), an event-loop lag probe, and collectors
+# that read cache stats at scrape time. Updates may come from database worker
+# threads, so every metric guards its values with a lock.
+
+METRICS_LOOP_LAG_INTERVAL_MS = float(os.getenv("METRICS_LOOP_LAG_INTERVAL_MS", "500"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Starlette appends "; charset=utf-8" to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+Labels = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}" for key, value in items
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labelnames + ("le",), key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics plus scrape-time collectors, rendered as one exposition"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a callable returning exposition lines, run on every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "astramind_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "astramind_http_request_duration_seconds", "HTTP request latency until the body is sent", ("method", "route")
+)
+http_in_flight = registry.gauge(
+    "astramind_http_requests_in_flight", "HTTP requests currently being served", ("route",)
+)
+db_duration = registry.histogram(
+    "astramind_db_query_duration_seconds", "SQLite transaction time by operation", ("operation",), DB_BUCKETS
+)
+llm_duration = registry.histogram(
+    "astramind_llm_request_duration_seconds", "LLM completion latency by provider and outcome",
+    ("provider", "outcome"), LLM_BUCKETS
+)
+llm_tokens = registry.counter(
+    "astramind_llm_tokens_total",
+    "LLM tokens reported by providers, streams included (except Azure API versions before 2024-06-01)",
+    ("provider", "kind")
+)
+outbound_duration = registry.histogram(
+    "astramind_outbound_request_duration_seconds", "Outbound HTTP call latency (YouTube Data API)",
+    ("host", "endpoint", "status")
+)
+loop_lag = registry.histogram(
+    "astramind_event_loop_lag_seconds", "Delay of the event loop beyond a scheduled wake-up", (), LAG_BUCKETS
+)
+
+
+def observe_db(operation: str, seconds: float):
+    db_duration.observe(seconds, operation=operation)
+
+
+def observe_llm(provider: str, outcome: str, seconds: float, usage: Dict[str, int]):
+    llm_duration.observe(seconds, provider=provider, outcome=outcome)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            llm_tokens.inc(usage[kind], provider=provider, kind=kind.replace("_tokens", ""))
+
+
+def outbound_hooks() -> dict:
+    """httpx event_hooks timing each request by host and last path segment"""
+    async def on_request(request: httpx.Request):
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        start = response.request.extensions.get("metrics_start")
+        if start is not None:
+            endpoint = response.request.url.path.rstrip("/").rsplit("/", 1)[-1]
+            outbound_duration.observe(time.perf_counter() - start, host=response.request.url.host,
+                                      endpoint=endpoint, status=str(response.status_code))
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def cache_collector(caches: Dict[str, Callable[[], Optional[dict]]]) -> Callable[[], List[str]]:
+    """Exposition lines for cache hits, misses and hit ratio from each cache's stats()"""
+    def collect() -> List[str]:
+        lookups = ["# HELP astramind_cache_lookups_total Cache lookups by result",
+                   "# TYPE astramind_cache_lookups_total counter"]
+        ratios = ["# HELP astramind_cache_hit_ratio Cache hit ratio since start",
+                  "# TYPE astramind_cache_hit_ratio gauge"]
+        for name, stats_of in caches.items():
+            stats = stats_of()
+            if not stats:
+                continue
+            hits = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0))
+            for result, value in (("hit", hits), ("miss", stats.get("misses", 0))):
+                lookups.append(f"astramind_cache_lookups_total"
+                               f"{format_labels(('cache', 'result'), (name, result))} {format_value(value)}")
+            ratios.append(f"astramind_cache_hit_ratio{format_labels(('cache',), (name,))} "
+                          f"{format_value(stats.get('hit_ratio', 0.0))}")
+        return lookups + ratios
+
+    return collect
+
+
+def route_of(scope) -> str:
+    """The route template a request will match, so path parameters stay out of labels"""
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        route = route_of(scope)
+        http_in_flight.inc(route=route)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec(route=route)
+            http_duration.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            http_requests.inc(method=scope["method"], route=route, status=str(status))
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up from a fixed sleep"""
+
+    def __init__(self, interval_ms: float = METRICS_LOOP_LAG_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(0.0, loop.time() - start - self.interval))
+
+
+loop_lag_monitor = LoopLagMonitor()
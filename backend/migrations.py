@@ -0,0 +1,182 @@
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+# Versioned schema migrations.
+# Each migration runs once, in order, and is recorded in schema_migrations.
+# Databases created before versioning existed pick up at version 1, whose
+# statements are all idempotent. Append new migrations; never edit applied ones.
+
+
+def initial_schema(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_summaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Topic lookups for the /yt-summary cache; older databases may hold duplicate
+    # video_ids, so keep only the newest row before enforcing uniqueness
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_youtube_summaries_video_id'")
+    if not cursor.fetchone():
+        cursor.execute('DELETE FROM youtube_summaries WHERE id NOT IN (SELECT MAX(id) FROM youtube_summaries GROUP BY video_id)')
+        cursor.execute('CREATE UNIQUE INDEX idx_youtube_summaries_video_id ON youtube_summaries (video_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_youtube_summaries_topic ON youtube_summaries (topic, created_at)')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_searches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            role TEXT NOT NULL,
+            location TEXT NOT NULL,
+            results TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            reminder_time TIMESTAMP NOT NULL,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            user_id TEXT,
+            FOREIGN KEY (user_id) REFERENCES user_profiles (uid)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_profiles (
+            uid TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            display_name TEXT NOT NULL,
+            role TEXT DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            task_count INTEGER DEFAULT 0,
+            plan TEXT DEFAULT 'free'
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS task_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            task_type TEXT NOT NULL,
+            command TEXT,
+            status TEXT NOT NULL,
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES user_profiles (uid)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            provider TEXT,
+            model TEXT,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS background_tasks (
+            id TEXT PRIMARY KEY,
+            task_type TEXT NOT NULL,
+            user_id TEXT,
+            priority INTEGER NOT NULL DEFAULT 10,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            current_operation TEXT,
+            logs TEXT NOT NULL DEFAULT '[]',
+            eta_seconds REAL,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_background_tasks_status ON background_tasks (status)')
+
+
+def hot_path_indexes(conn: sqlite3.Connection):
+    # /user-tasks: WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_task_history_user_time ON task_history (user_id, timestamp DESC)')
+    # /reminders: only pending rows, kept in reminder_time order
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reminders_pending
+        ON reminders (reminder_time) WHERE status = 'pending'
+    ''')
+    # LLM cache pruning by expiry and by least recent access
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache (expires_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)')
+
+
+def task_history_keyset_index(conn: sqlite3.Connection):
+    # Keyset pages order by (timestamp DESC, id DESC); an ascending index scanned
+    # backwards yields exactly that order (rowid ties included), with no sort step
+    conn.execute('DROP INDEX IF EXISTS idx_task_history_user_time')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_task_history_user_timestamp ON task_history (user_id, timestamp)')
+
+
+def youtube_topic_fetches(conn: sqlite3.Connection):
+    # One row per normalised topic whose last search was summarized in full:
+    # the ranked video ids it returned (a JSON list), so partial runs are never
+    # served as complete and a video shared by two topics stays in both
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS youtube_topic_fetches (
+            topic TEXT PRIMARY KEY,
+            video_ids TEXT NOT NULL,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "initial schema", initial_schema),
+    (2, "hot path indexes", hot_path_indexes),
+    (3, "task history keyset index", task_history_keyset_index),
+    (4, "youtube topic fetches", youtube_topic_fetches),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    ''')
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_migrations').fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> List[int]:
+    """Apply pending migrations in one transaction and return the versions applied"""
+    # Take the write lock first so concurrently starting workers migrate one at a time
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+    current = schema_version(conn)
+    applied = []
+    for version, name, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        apply(conn)
+        conn.execute(
+            'INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+            (version, name, datetime.now().isoformat()),
+        )
+        applied.append(version)
+    return applied
@@ -0,0 +1,53 @@
+import json
+import base64
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort key of the last row a client has seen, encoded as an
+# opaque URL-safe token; the next page is fetched with a row-value comparison
+# against it, so every page is an index range scan regardless of depth.
+
+PAGE_MAX_LIMIT = 1000
+STREAM_PAGE_SIZE = 500
+
+
+def encode_cursor(key: Sequence) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """Sort key from a cursor token; HTTPException(400) for anything malformed"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, PAGE_MAX_LIMIT))
+
+
+async def stream_ndjson(fetch_page: Callable[[Optional[list], int], Awaitable[List[tuple]]],
+                        to_item: Callable[[tuple], dict],
+                        key_of: Callable[[tuple], Sequence],
+                        after: Optional[list] = None,
+                        page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[bytes]:
+    """Yield every row after the cursor as one JSON line, fetching a page at a time
+
+    Each page is its own short query, so a slow client never pins a database
+    connection and memory stays at one page however long the result is.
+    """
+    while True:
+        rows = await fetch_page(after, page_size)
+        for row in rows:
+            yield (json.dumps(to_item(row)) + "\n").encode()
+        if len(rows) < page_size:
+            return
+        after = list(key_of(rows[-1]))
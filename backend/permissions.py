@@ -0,0 +1,90 @@
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from db import Database, db
+
+# Role lookups and permission checks for user-initiated operations.
+# Roles (and plans, for admission control) are cached in memory for
+# PERMISSION_CACHE_TTL_SECONDS (unknown users too, so repeated calls with a bad
+# uid stay off the database); writes to user_profiles must call
+# role_cache.invalidate().
+
+PERMISSION_CACHE_TTL_SECONDS = float(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "60"))
+PERMISSION_CACHE_MAX_ENTRIES = int(os.getenv("PERMISSION_CACHE_MAX_ENTRIES", "10000"))
+
+# Operations containing any of these words are reserved for admins
+RESTRICTED_OPERATIONS = ("emergency", "system", "admin", "configure")
+_RESTRICTED = re.compile("|".join(map(re.escape, RESTRICTED_OPERATIONS)), re.IGNORECASE)
+
+_MISSING = object()
+
+
+def is_permitted(role: Optional[str], operation: str) -> bool:
+    if role is None:
+        return False
+    # Admin can do everything
+    if role == "admin":
+        return True
+    return _RESTRICTED.search(operation) is None
+
+
+class RoleCache:
+    """TTL + LRU cache of user_profiles (role, plan) by uid"""
+
+    def __init__(self, database: Database = db, ttl: float = PERMISSION_CACHE_TTL_SECONDS,
+                 max_entries: int = PERMISSION_CACHE_MAX_ENTRIES):
+        self.db = database
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # uid -> ((role, plan) or None, expires_at)
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0}
+
+    async def _profile(self, user_id: str) -> Optional[tuple]:
+        entry = self._entries.get(user_id, _MISSING)
+        if entry is not _MISSING:
+            profile, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.counters["hits"] += 1
+                return profile
+            self.counters["expired"] += 1
+
+        self.counters["misses"] += 1
+        row = await self.db.fetchone('SELECT role, plan FROM user_profiles WHERE uid = ?', (user_id,))
+        profile = (row[0], row[1]) if row else None
+        self._entries[user_id] = (profile, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return profile
+
+    async def get_role(self, user_id: str) -> Optional[str]:
+        profile = await self._profile(user_id)
+        return profile[0] if profile else None
+
+    async def get_plan(self, user_id: str) -> Optional[str]:
+        """The user's plan, or None for unknown users"""
+        profile = await self._profile(user_id)
+        return profile[1] if profile else None
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Forget one user's role, or every cached role when user_id is None"""
+        self.counters["invalidations"] += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+role_cache = RoleCache()
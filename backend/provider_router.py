@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from llm_client import LLMClient, LLMError, ChatResult, llm
+
+# Latency-aware routing across LLM providers (provider=auto).
+# Every provider keeps a rolling window of call latencies and outcomes. Calls
+# go to the healthy provider with the lowest error-weighted median latency; if
+# it has not answered by its own p95, a hedged request goes to the runner-up
+# and whichever answers first wins while the other is cancelled. A provider
+# that keeps failing is circuit-broken for a cooldown, then let back in with a
+# single probe call.
+
+LLM_ROUTER_PROVIDERS = [
+    name.strip() for name in os.getenv("LLM_ROUTER_PROVIDERS", "openai,anthropic,azure,stub").split(",") if name.strip()
+]
+LLM_ROUTER_WINDOW = int(os.getenv("LLM_ROUTER_WINDOW", "100"))
+# Percentiles are trusted only after this many calls; before that the defaults apply
+LLM_ROUTER_MIN_SAMPLES = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "50"))
+LLM_HEDGE_DEFAULT_DELAY_MS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_MS", "2000"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Each point of error rate makes a provider look this much slower when ranking
+ERROR_RATE_PENALTY = 4.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider"""
+
+    def __init__(self, name: str, window: int = LLM_ROUTER_WINDOW):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.counters = {"calls": 0, "failures": 0, "cancelled": 0, "breaker_opens": 0}
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency(self, pct: float) -> Optional[float]:
+        if len(self.latencies) < LLM_ROUTER_MIN_SAMPLES:
+            return None
+        return percentile(self.latencies, pct)
+
+    def score(self) -> float:
+        """Expected latency in seconds; unmeasured providers score 0 so they get sampled"""
+        if not self.latencies:
+            return 0.0
+        return percentile(self.latencies, 50) * (1 + ERROR_RATE_PENALTY * self.error_rate)
+
+    def available(self, now: float) -> bool:
+        if self.state == OPEN:
+            return now - self.opened_at >= LLM_BREAKER_COOLDOWN_SECONDS
+        return self.state == CLOSED or not self.probing
+
+    def acquire(self, now: float) -> bool:
+        """Claim a call slot; past the cooldown an open breaker admits exactly one probe"""
+        if not self.available(now):
+            return False
+        if self.state != CLOSED:
+            self.state = HALF_OPEN
+            self.probing = True
+        return True
+
+    def record_success(self, latency: float):
+        self.counters["calls"] += 1
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.probing = False
+        if self.state != CLOSED:
+            logger.info("LLM provider %s recovered", self.name)
+            # A fresh start: the failures that opened the breaker are history
+            self.outcomes.clear()
+            self.outcomes.append(True)
+        self.state = CLOSED
+
+    def record_failure(self):
+        self.counters["calls"] += 1
+        self.counters["failures"] += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.probing = False
+        failing = self.consecutive_failures >= LLM_BREAKER_FAILURES or (
+            len(self.outcomes) >= LLM_ROUTER_MIN_SAMPLES and self.error_rate >= LLM_BREAKER_ERROR_RATE
+        )
+        if self.state == HALF_OPEN or (self.state == CLOSED and failing):
+            if self.state == CLOSED:
+                self.counters["breaker_opens"] += 1
+                logger.warning("LLM provider %s circuit opened (error rate %.0f%%)", self.name, self.error_rate * 100)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        # A hedging loser says nothing about the provider's health
+        self.counters["cancelled"] += 1
+        self.probing = False
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency(50), self.latency(95)
+        return {
+            **self.counters,
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ProviderRouter:
+    """Routes chat calls to the fastest healthy provider with hedging and failover"""
+
+    def __init__(self, client: LLMClient = llm, providers: List[str] = LLM_ROUTER_PROVIDERS,
+                 hedge: bool = LLM_HEDGE_ENABLED):
+        self.client = client
+        self.providers = providers
+        self.hedge = hedge
+        self.health: Dict[str, ProviderHealth] = {}
+        self.counters = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "exhausted": 0}
+
+    def _health(self, name: str) -> ProviderHealth:
+        if name not in self.health:
+            self.health[name] = ProviderHealth(name)
+        return self.health[name]
+
+    def candidates(self) -> List[str]:
+        """Usable providers, best first"""
+        names = [
+            name for name in self.providers
+            if self.client.has_provider(name) and self.client.providers[name].configured
+        ]
+        now = time.monotonic()
+        return sorted(
+            (name for name in names if self._health(name).available(now)),
+            key=lambda name: self._health(name).score(),
+        )
+
+    def hedge_delay(self, name: str) -> float:
+        p95 = self._health(name).latency(95)
+        delay = p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY_MS / 1000
+        return max(delay, LLM_HEDGE_MIN_DELAY_MS / 1000)
+
+    async def _timed(self, name: str, attempt: Callable[[str], Awaitable]):
+        health = self._health(name)
+        start = time.perf_counter()
+        try:
+            result = await attempt(name)
+        except asyncio.CancelledError:
+            health.record_cancelled()
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        if isinstance(result, ChatResult) and result.cached:
+            health.probing = False
+        else:
+            health.record_success(time.perf_counter() - start)
+        return result
+
+    async def _race(self, attempt: Callable[[str], Awaitable], hedge: Optional[bool] = None,
+                    discard: Optional[Callable[[object], Awaitable]] = None) -> Tuple[str, object]:
+        """Run attempt on the best provider, hedging to and failing over onto the next ones"""
+        queue = self.candidates()
+        self.counters["requests"] += 1
+        hedge = self.hedge if hedge is None else hedge
+        running: Dict[asyncio.Task, str] = {}
+        errors = []
+        hedged = False
+        primary = None
+
+        def launch() -> bool:
+            nonlocal primary
+            while queue:
+                name = queue.pop(0)
+                # Another call may have taken a half-open provider's probe meanwhile
+                if not self._health(name).acquire(time.monotonic()):
+                    continue
+                if not running:
+                    primary = name
+                running[asyncio.create_task(self._timed(name, attempt))] = name
+                return True
+            return False
+
+        if not launch():
+            raise LLMError("No healthy LLM provider available")
+        try:
+            while running:
+                timeout = None
+                if hedge and not hedged and queue and len(running) == 1:
+                    timeout = self.hedge_delay(primary)
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Still waiting past the primary's p95: race the runner-up
+                    hedged = True
+                    if launch():
+                        self.counters["hedged"] += 1
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if name != primary and hedged:
+                            self.counters["hedge_wins"] += 1
+                        return name, task.result()
+                    errors.append(f"{name}: {task.exception()}")
+                if not running and launch():
+                    self.counters["failovers"] += 1
+        finally:
+            for task in running:
+                task.cancel()
+            for task, name in running.items():
+                try:
+                    result = await task
+                except (asyncio.CancelledError, Exception):
+                    continue
+                # Finished in the same instant as the winner
+                if discard is not None:
+                    await discard(result)
+
+        self.counters["exhausted"] += 1
+        raise LLMError("All LLM providers failed: " + "; ".join(errors))
+
+    async def chat(self, messages: List[dict], max_tokens: int = 500, use_cache: bool = True,
+                   hedge: Optional[bool] = None) -> ChatResult:
+        """Chat completion from whichever provider answers first; result.provider names it"""
+        async def attempt(name: str) -> ChatResult:
+            return await self.client.chat(messages, provider=name, max_tokens=max_tokens, use_cache=use_cache)
+
+        _, result = await self._race(attempt, hedge)
+        return result
+
+    async def open_stream(self, messages: List[dict], max_tokens: int = 500, use_cache: bool = True,
+                          hedge: Optional[bool] = None) -> Tuple[str, AsyncIterator[str]]:
+        """Start a streamed completion; returns (provider, chunks)
+
+        Providers race for the first chunk, so hedging cuts time-to-first-token;
+        after that the winner streams alone.
+        """
+        async def attempt(name: str):
+            chunks = self.client.stream_chat(messages, provider=name, max_tokens=max_tokens, use_cache=use_cache)
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = None
+            except BaseException:
+                await chunks.aclose()
+                raise
+            return chunks, first
+
+        async def discard(result):
+            await result[0].aclose()
+
+        name, (chunks, first) = await self._race(attempt, hedge, discard)
+        return name, self._rest(name, chunks, first)
+
+    async def _rest(self, name: str, chunks: AsyncIterator[str], first: Optional[str]) -> AsyncIterator[str]:
+        try:
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        except LLMError:
+            self._health(name).record_failure()
+            raise
+        finally:
+            await chunks.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "providers": {name: health.stats() for name, health in self.health.items()},
+        }
+
+
+provider_router = ProviderRouter()
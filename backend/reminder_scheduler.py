@@ -0,0 +1,170 @@
+import os
+import heapq
+import time
+import asyncio
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from db import Database, db
+
+# In-process dispatcher for due reminders.
+# Pending reminders live in a min-heap of (due timestamp, id) pairs, loaded
+# once at startup and extended as reminders are created, so the table is never
+# polled. The dispatcher sleeps until the earliest due time, claims due rows
+# by flipping them from 'pending' to 'fired' (rows cancelled or already fired
+# by another worker are skipped), then hands each one to the registered hooks.
+
+REMINDER_LOAD_PAGE_SIZE = int(os.getenv("REMINDER_LOAD_PAGE_SIZE", "10000"))
+REMINDER_FIRE_BATCH_SIZE = int(os.getenv("REMINDER_FIRE_BATCH_SIZE", "500"))
+# Upper bound on one sleep, so wall-clock jumps are noticed
+REMINDER_MAX_SLEEP_SECONDS = float(os.getenv("REMINDER_MAX_SLEEP_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[dict], Awaitable[None]]
+
+
+def due_timestamp(reminder_time: str) -> float:
+    return datetime.fromisoformat(reminder_time).timestamp()
+
+
+def load_page(conn: sqlite3.Connection, after: Optional[tuple], limit: int) -> list:
+    if after is None:
+        return conn.execute('''
+            SELECT id, reminder_time FROM reminders
+            WHERE status = 'pending'
+            ORDER BY reminder_time ASC, id ASC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+    return conn.execute('''
+        SELECT id, reminder_time FROM reminders
+        WHERE status = 'pending' AND (reminder_time, id) > (?, ?)
+        ORDER BY reminder_time ASC, id ASC
+        LIMIT ?
+    ''', (*after, limit)).fetchall()
+
+
+def claim(conn: sqlite3.Connection, reminder_ids: List[int]) -> list:
+    placeholders = ",".join("?" * len(reminder_ids))
+    return conn.execute(f'''
+        UPDATE reminders SET status = 'fired'
+        WHERE status = 'pending' AND id IN ({placeholders})
+        RETURNING id, task, reminder_time, user_id, created_at
+    ''', reminder_ids).fetchall()
+
+
+class ReminderScheduler:
+    """Min-heap of pending reminders with a single dispatcher task"""
+
+    def __init__(self, database: Database = db):
+        self.db = database
+        self._heap: List[tuple] = []
+        self._listeners: List[Listener] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"loaded": 0, "scheduled": 0, "fired": 0, "skipped": 0, "hook_errors": 0,
+                         "unparseable": 0}
+
+    def add_listener(self, listener: Listener):
+        """Register an async hook called with each fired reminder"""
+        self._listeners.append(listener)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._heap = []
+        after = None
+        # Page through the partial pending index instead of one huge result set
+        while True:
+            rows = await self.db.run(load_page, after, REMINDER_LOAD_PAGE_SIZE)
+            for reminder_id, reminder_time in rows:
+                try:
+                    self._heap.append((due_timestamp(reminder_time), reminder_id))
+                except (TypeError, ValueError):
+                    # One bad row must not keep the app from starting
+                    self.counters["unparseable"] += 1
+                    logger.warning("Skipping reminder %s with unparseable time %r", reminder_id, reminder_time)
+            if len(rows) < REMINDER_LOAD_PAGE_SIZE:
+                break
+            after = (rows[-1][1], rows[-1][0])
+        heapq.heapify(self._heap)
+        self.counters["loaded"] = len(self._heap)
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def schedule(self, reminder_id: int, reminder_time: str):
+        """Add a newly created pending reminder"""
+        due = due_timestamp(reminder_time)
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, reminder_id))
+        self.counters["scheduled"] += 1
+        # Only an earlier deadline changes how long the dispatcher should sleep
+        if self._wake is not None and (earliest is None or due < earliest):
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), min(delay, REMINDER_MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            due_ids = []
+            while self._heap and self._heap[0][0] <= now and len(due_ids) < REMINDER_FIRE_BATCH_SIZE:
+                due_ids.append(heapq.heappop(self._heap)[1])
+            try:
+                await self._fire(due_ids)
+            except Exception as e:
+                # Leave them pending in the table; they are picked up again on the next start
+                logger.error("Failed to fire reminders %s: %s", due_ids, e)
+
+    async def _fire(self, reminder_ids: List[int]):
+        rows = await self.db.run(claim, reminder_ids)
+        self.counters["fired"] += len(rows)
+        self.counters["skipped"] += len(reminder_ids) - len(rows)
+        for row in rows:
+            reminder = {
+                "id": row[0],
+                "task": row[1],
+                "reminder_time": row[2],
+                "user_id": row[3],
+                "created_at": row[4],
+                "status": "fired",
+                "fired_at": datetime.now().isoformat(),
+            }
+            for listener in self._listeners:
+                try:
+                    await listener(reminder)
+                except Exception as e:
+                    self.counters["hook_errors"] += 1
+                    logger.warning("Reminder hook failed for %s: %s", reminder["id"], e)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pending": len(self._heap),
+            "next_due": datetime.fromtimestamp(self._heap[0][0]).isoformat() if self._heap else None,
+        }
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,236 @@
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Near-duplicate cache for LLM command interpretations.
+# Commands are embedded locally as hashed n-gram vectors (word unigrams and
+# bigrams plus character trigrams, signed feature hashing, L2-normalised), so
+# "remind me to call mom" and "reminder call mom" land close together without
+# any model or network. All vectors live in one preallocated float32 matrix, a
+# lookup is a single sparse-by-dense product over it, and a hit needs cosine
+# similarity of at least SEMANTIC_CACHE_THRESHOLD within the same scope
+# (provider and user) and the same signature: polarity, numbers and day/time
+# words must agree exactly, so "delete my account" never matches "do not delete
+# my account" and "transfer 500 dollars" never matches "transfer 5000 dollars".
+# Expired slots are reused first, then the least recently used.
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_DIMENSIONS = int(os.getenv("SEMANTIC_CACHE_DIMENSIONS", "1024"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+
+# Words that change the phrasing of a command but not what is asked
+FILLER_WORDS = frozenset(
+    "a an the please can could would you will me my i to for hey ok okay astra astramind just kindly "
+    "is are it do does some right now what how of in into about on with like tell give".split()
+)
+# Words that flip a command's meaning; kept as features and matched on exactly
+NEGATIONS = frozenset("not no never nothing nobody nowhere neither nor cannot".split())
+# Words naming a quantity, day or time; together with digits they must match exactly
+EXACT_WORDS = frozenset(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen "
+    "seventeen eighteen nineteen twenty thirty forty fifty sixty seventy eighty ninety hundred thousand "
+    "million billion half quarter dozen first second third last next "
+    "today tonight tomorrow yesterday morning afternoon evening night noon midnight am pm weekend "
+    "monday tuesday wednesday thursday friday saturday sunday mon tue tues wed thu thur thurs fri sat sun "
+    "january february march april may june july august september october november december "
+    "jan feb mar apr jun jul aug sep sept oct nov dec".split()
+)
+CONTRACTIONS = [
+    (re.compile(r"\bwhats\b"), "what is"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'ll\b"), " will"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"'s\b"), " is"),
+]
+SUFFIXES = ("ing", "ed", "es", "er", "s", "e", "y")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Feature weights: whole words dominate, so swapping one content word
+# ("Australia" for "Austria") breaks a match that shared trigrams would keep
+CHAR_TRIGRAM_WEIGHT = 0.2
+WORD_BIGRAM_WEIGHT = 0.5
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def words_of(text: str) -> List[str]:
+    text = text.lower()
+    for pattern, replacement in CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return _TOKEN.findall(text)
+
+
+def tokenize(text: str) -> List[str]:
+    words = words_of(text)
+    content = [word if word in NEGATIONS else stem(word) for word in words if word not in FILLER_WORDS]
+    return content or words
+
+
+def negated(text: str) -> bool:
+    """Whether text contains a negation (odd count, so "not ... no" reads as positive)"""
+    return sum(word in NEGATIONS for word in words_of(text)) % 2 == 1
+
+
+def signature(text: str) -> int:
+    """Hash of what must match exactly: polarity plus the numbers and day/time words, in any order"""
+    words = words_of(text)
+    exact = sorted(word for word in words if word in EXACT_WORDS or any(char.isdigit() for char in word))
+    return zlib.crc32(f"{negated(text)}:{' '.join(exact)}".encode())
+
+
+def embed(text: str, dimensions: int = SEMANTIC_CACHE_DIMENSIONS) -> np.ndarray:
+    """Signed hashed n-gram vector of text, L2-normalised (all zeros for empty text)"""
+    words = tokenize(text)
+    features: Dict[str, float] = {}
+
+    def add(feature: str, weight: float):
+        features[feature] = features.get(feature, 0.0) + weight
+
+    for word in words:
+        add("w:" + word, 1.0)
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            add("c:" + padded[i:i + 3], CHAR_TRIGRAM_WEIGHT)
+    for first, second in zip(words, words[1:]):
+        add(f"b:{first} {second}", WORD_BIGRAM_WEIGHT)
+
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, weight in features.items():
+        digest = zlib.crc32(feature.encode())
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % dimensions] += sign * weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """Bounded vector index mapping commands to prior interpretations
+
+    Vectors are stored feature-major (one column per entry) and a query only
+    has a few dozen non-zero features, so a lookup multiplies just those rows
+    of the occupied columns instead of the whole matrix.
+    """
+
+    def __init__(self, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 dimensions: int = SEMANTIC_CACHE_DIMENSIONS,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: float = SEMANTIC_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors = np.zeros((dimensions, max_entries), dtype=np.float32)
+        self._scopes = np.zeros(max_entries, dtype=np.int32)
+        self._signatures = np.zeros(max_entries, dtype=np.uint32)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._texts: List[Optional[str]] = [None] * max_entries
+        self._responses: List[Optional[str]] = [None] * max_entries
+        self._scope_ids: Dict[str, int] = {}
+        self._size = 0  # slots in use are always 0.._size-1
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _scope_id(self, scope: str, now: float) -> int:
+        if scope not in self._scope_ids and len(self._scope_ids) >= 2 * self.max_entries:
+            self._compact_scopes(now)
+        return self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def _compact_scopes(self, now: float):
+        """Renumber the scopes of live entries; dead slots get -1, which no scope uses"""
+        size = self._size
+        live = self._expires[:size] > now
+        used = np.unique(self._scopes[:size][live])
+        names = {scope_id: scope for scope, scope_id in self._scope_ids.items()}
+        remap = np.full(len(self._scope_ids), -1, dtype=np.int32)
+        remap[used] = np.arange(used.size, dtype=np.int32)
+        self._scopes[:size] = np.where(live, remap[self._scopes[:size]], -1)
+        self._scope_ids = {names[int(scope_id)]: new_id for new_id, scope_id in enumerate(used)}
+
+    def get(self, scope: str, text: str, threshold: Optional[float] = None) -> Optional[dict]:
+        """Closest cached interpretation in scope if similar enough: {response, matched, similarity}"""
+        query = embed(text, self.dimensions)
+        features = np.flatnonzero(query)
+        size = self._size
+        scope_id = self._scope_ids.get(scope)
+        if not features.size or not size or scope_id is None:
+            self.counters["misses"] += 1
+            return None
+
+        now = time.time()
+        similarities = query[features] @ self._vectors[features, :size]
+        live = (
+            (self._scopes[:size] == scope_id)
+            & (self._signatures[:size] == signature(text))
+            & (self._expires[:size] > now)
+        )
+        similarities[~live] = -1.0
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < (self.threshold if threshold is None else threshold):
+            self.counters["misses"] += 1
+            return None
+
+        self._last_used[best] = now
+        self.counters["hits"] += 1
+        return {
+            "response": self._responses[best],
+            "matched": self._texts[best],
+            "similarity": round(similarity, 4),
+        }
+
+    def _free_slot(self, now: float) -> int:
+        if self._size < self.max_entries:
+            self._size += 1
+            return self._size - 1
+        expired = np.flatnonzero(self._expires <= now)
+        if expired.size:
+            return int(expired[0])
+        # Full of live entries: replace the least recently used one
+        self.counters["evictions"] += 1
+        return int(np.argmin(self._last_used))
+
+    def set(self, scope: str, text: str, response: str):
+        vector = embed(text, self.dimensions)
+        if not vector.any():
+            return
+        now = time.time()
+        slot = self._free_slot(now)
+        self._vectors[:, slot] = vector
+        self._scopes[slot] = self._scope_id(scope, now)
+        self._signatures[slot] = signature(text)
+        self._expires[slot] = now + self.ttl
+        self._last_used[slot] = now
+        self._texts[slot] = text
+        self._responses[slot] = response
+        self.counters["stores"] += 1
+
+    def clear(self):
+        self._size = 0
+        self._scope_ids = {}
+        self._texts = [None] * self.max_entries
+        self._responses = [None] * self.max_entries
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": int((self._expires[:self._size] > time.time()).sum()),
+            "scopes": len(self._scope_ids),
+            "threshold": self.threshold,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
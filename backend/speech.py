@@ -0,0 +1,258 @@
+import os
+import re
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from gtts import gTTS
+
+# Content-addressed cache for synthesized speech.
+# Each (text, language, slow) combination is rendered once into
+# TTS_CACHE_DIR/<sha256>.mp3; the directory is kept under a byte cap by
+# evicting the least recently served files.
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "audio")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+TTS_STREAM_CHUNK_CHARS = int(os.getenv("TTS_STREAM_CHUNK_CHARS", "200"))
+
+# Sentence boundaries, including the Devanagari danda used in Hindi and Marathi
+_SENTENCE_END = re.compile(r"(?<=[.!?\u0964])\s+")
+READ_BLOCK_BYTES = 16 * 1024
+
+# gTTS calls are blocking HTTP round-trips; a dedicated pool bounds them globally
+tts_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="astramind-tts")
+
+
+def speech_key(text: str, language: str, slow: bool) -> str:
+    return hashlib.sha256(f"{language}\0{int(slow)}\0{text}".encode("utf-8")).hexdigest()
+
+
+def split_sentences(text: str, max_chars: int = TTS_STREAM_CHUNK_CHARS) -> List[str]:
+    """Split text into sentence-aligned chunks of at most max_chars (long sentences split on spaces)"""
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        pieces = [sentence]
+        if len(sentence) > max_chars:
+            pieces, line = [], ""
+            for word in sentence.split():
+                if line and len(line) + 1 + len(word) > max_chars:
+                    pieces.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}" if line else word
+            if line:
+                pieces.append(line)
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def validate_speech(text: str, language: str):
+    """Raise ValueError for blank text or a language gTTS would reject (checked offline)"""
+    if not text.strip():
+        raise ValueError("No text to speak")
+    gTTS(text=text, lang=language)
+
+
+def synthesize_to_file(text: str, language: str, slow: bool, path: str):
+    """Render speech with gTTS into path via a temp file, so readers never see partial audio"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(suffix=".mp3.part", dir=directory)
+    os.close(fd)
+    try:
+        gTTS(text=text, lang=language, slow=slow).save(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+class SpeechCache:
+    """On-disk LRU of rendered MP3 files keyed by hash of the synthesis inputs"""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loaded = False
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def load(self):
+        """Index existing cache files by last access and drop leftover partial renders"""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".part"):
+                os.unlink(path)
+            elif name.endswith(".mp3"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(".mp3")], stat.st_size))
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            for _, key, size in sorted(files):
+                self._entries[key] = size
+                self._total_bytes += size
+        self._loaded = True
+        self._evict()
+
+    def _touch(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+        try:
+            # mtime doubles as the persisted access time for the next load()
+            os.utime(self.path_for(key))
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+            return False
+        return True
+
+    def _add(self, key: str):
+        size = os.path.getsize(self.path_for(key))
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes:
+                    return
+                victim = next((key for key in self._entries if key != keep), None)
+                if victim is None:
+                    return
+                self._total_bytes -= self._entries.pop(victim)
+                self.counters["evictions"] += 1
+            try:
+                os.unlink(self.path_for(victim))
+            except FileNotFoundError:
+                pass
+
+    async def get_or_synthesize(self, text: str, language: str = "en", slow: bool = False) -> tuple:
+        """Return (key, path) of the MP3 for these inputs, rendering it at most once"""
+        if not self._loaded:
+            self.load()
+        key = speech_key(text, language, slow)
+        if self._touch(key):
+            self.counters["hits"] += 1
+            return key, self.path_for(key)
+
+        # Concurrent requests for the same phrase share one synthesis
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The owning request went away mid-render; take over unless we were cancelled
+                if not pending.cancelled():
+                    raise
+                return await self.get_or_synthesize(text, language, slow)
+            self.counters["hits"] += 1
+            return key, self.path_for(key)
+
+        self.counters["misses"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            await loop.run_in_executor(tts_executor, synthesize_to_file, text, language, slow, self.path_for(key))
+            self._add(key)
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise the failure; mark it retrieved for the owner
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+        return key, self.path_for(key)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+speech_cache = SpeechCache()
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def stream_speech(text: str, language: str = "en", slow: bool = False,
+                        lookahead: int = TTS_WORKERS) -> AsyncIterator[bytes]:
+    """Yield MP3 audio sentence by sentence as soon as each chunk is rendered
+
+    Up to `lookahead` chunks are synthesized in parallel ahead of the one being
+    sent; MP3 frames concatenate, so the chunks play back as one stream. Each
+    chunk goes through the speech cache, so repeated sentences are reused.
+    """
+    chunks = split_sentences(text)
+    loop = asyncio.get_running_loop()
+    tasks: List[asyncio.Task] = []
+    try:
+        for index in range(len(chunks)):
+            while len(tasks) < min(len(chunks), index + lookahead):
+                tasks.append(asyncio.create_task(
+                    speech_cache.get_or_synthesize(chunks[len(tasks)], language, slow)
+                ))
+            _, path = await tasks[index]
+            audio = await loop.run_in_executor(None, read_file, path)
+            for offset in range(0, len(audio), READ_BLOCK_BYTES):
+                yield audio[offset:offset + READ_BLOCK_BYTES]
+    finally:
+        # Client disconnected or a chunk failed: stop rendering the rest
+        for task in tasks:
+            task.cancel()
+
+
+async def open_speech_stream(text: str, language: str = "en", slow: bool = False) -> AsyncIterator[bytes]:
+    """stream_speech once the input is validated and the first block rendered
+
+    Bad input and a failed first chunk raise here, before a response has started,
+    so they can still become an error status instead of an empty 200.
+    """
+    validate_speech(text, language)
+    audio = stream_speech(text, language, slow)
+    first = await audio.__anext__()
+
+    async def blocks():
+        try:
+            yield first
+            async for block in audio:
+                yield block
+        finally:
+            await audio.aclose()
+
+    return blocks()
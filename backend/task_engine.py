@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import itertools
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from db import db, Database
+
+# In-process background job engine.
+# Jobs are persisted in the background_tasks table, executed by a fixed pool
+# of async workers in priority order, and report progress, log lines and an
+# ETA as they run. TASK_HIGH_PRIORITY_WORKERS more workers only take
+# PRIORITY_HIGH jobs, so an emergency never waits behind long browser jobs;
+# high jobs are offered to both pools and run by whichever claims them first. Queued jobs are re-queued on startup; jobs interrupted while
+# running are re-run only if their handler is idempotent, otherwise marked
+# failed. Every state change is also pushed to in-process subscribers (see
+# TaskSubscription).
+
+logger = logging.getLogger(__name__)
+
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", "4"))
+TASK_HIGH_PRIORITY_WORKERS = int(os.getenv("TASK_HIGH_PRIORITY_WORKERS", "1"))
+TASK_MAX_LOG_LINES = int(os.getenv("TASK_MAX_LOG_LINES", "200"))
+TASK_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("TASK_SUBSCRIBER_QUEUE_SIZE", "100"))
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class TaskContext:
+    """Handle passed to a running job for reporting progress"""
+
+    def __init__(self, engine: "TaskEngine", state: dict):
+        self._engine = engine
+        self.state = state
+        self._started = time.monotonic()
+
+    @property
+    def task_id(self) -> str:
+        return self.state["task_id"]
+
+    async def log(self, line: str):
+        logs = self.state["logs"]
+        entry = f"{datetime.now().strftime('%H:%M:%S')} {line}"
+        logs.append(entry)
+        del logs[:-TASK_MAX_LOG_LINES]
+        await self._engine._save(self.state, log_line=entry)
+
+    async def progress(self, percent: float, operation: Optional[str] = None):
+        """Record progress (0-100) and derive the ETA from the rate so far"""
+        percent = max(0.0, min(100.0, percent))
+        self.state["progress"] = percent
+        if operation:
+            self.state["current_operation"] = operation
+        elapsed = time.monotonic() - self._started
+        self.state["eta_seconds"] = round(elapsed * (100 - percent) / percent, 1) if percent else None
+        await self._engine._save(self.state)
+
+
+class TaskSubscription:
+    """Bounded event queue for one consumer of task updates
+
+    The publisher never blocks: when a slow consumer lets the queue fill up,
+    its pending events are dropped and replaced by a single resync marker,
+    after which the consumer receives fresh snapshots of its tasks.
+    """
+
+    RESYNC = {"type": "resync"}
+
+    def __init__(self, engine: "TaskEngine", maxsize: int = TASK_SUBSCRIBER_QUEUE_SIZE):
+        self._engine = engine
+        self.task_ids: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagging = False
+        self.dropped = 0
+
+    def offer(self, event: dict):
+        if self.lagging:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagging = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.queue.put_nowait(self.RESYNC)
+
+    def add(self, task_ids: Iterable[str]):
+        self._engine._attach(self, task_ids)
+
+    def remove(self, task_ids: Iterable[str]):
+        self._engine._detach(self, task_ids)
+
+    def close(self):
+        self._engine._detach(self, list(self.task_ids))
+
+    async def next_events(self) -> List[dict]:
+        """Wait for the next event(s); after an overflow, snapshots of every subscribed task"""
+        event = await self.queue.get()
+        if event is not self.RESYNC:
+            return [event]
+        self.lagging = False
+        snapshots = []
+        for task_id in list(self.task_ids):
+            snapshot = await self._engine.snapshot(task_id)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+
+Handler = Callable[..., Awaitable[dict]]
+
+
+class TaskEngine:
+    """Bounded-concurrency async job runner with SQLite-persisted state"""
+
+    def __init__(self, database: Database = db, workers: int = TASK_WORKERS,
+                 high_priority_workers: int = TASK_HIGH_PRIORITY_WORKERS):
+        self.db = database
+        self.worker_count = workers
+        self.high_priority_worker_count = high_priority_workers
+        self.handlers: Dict[str, Handler] = {}
+        self.idempotent: Set[str] = set()
+        self._states: Dict[str, dict] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._high_queue: Optional[asyncio.PriorityQueue] = None  # PRIORITY_HIGH jobs only
+        self._workers = []
+        self._sequence = itertools.count()
+        self._subscribers: Dict[str, Set[TaskSubscription]] = {}
+
+    def register(self, task_type: str, handler: Handler, idempotent: bool = False):
+        """Register handler(ctx, **params) -> result dict for a task type
+
+        Only idempotent handlers are re-run when a restart interrupts them mid-job.
+        """
+        self.handlers[task_type] = handler
+        if idempotent:
+            self.idempotent.add(task_type)
+        else:
+            self.idempotent.discard(task_type)
+
+    def subscribe(self, task_ids: Iterable[str] = ()) -> TaskSubscription:
+        """Create a subscription receiving updates for the given task ids"""
+        subscription = TaskSubscription(self)
+        subscription.add(task_ids)
+        return subscription
+
+    def _attach(self, subscription: TaskSubscription, task_ids: Iterable[str]):
+        for task_id in task_ids:
+            subscription.task_ids.add(task_id)
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+
+    def _detach(self, subscription: TaskSubscription, task_ids: Iterable[str]):
+        for task_id in task_ids:
+            subscription.task_ids.discard(task_id)
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[task_id]
+
+    def subscriber_count(self) -> int:
+        return len({id(s) for subscribers in self._subscribers.values() for s in subscribers})
+
+    def _publish(self, state: dict, log_line: Optional[str] = None):
+        subscribers = self._subscribers.get(state["task_id"])
+        if not subscribers:
+            return
+        final = state["status"] in FINAL_STATUSES
+        event = {
+            "type": state["status"] if final else "progress",
+            "task_id": state["task_id"],
+            "status": state["status"],
+            "progress": state["progress"],
+            "current_operation": state["current_operation"],
+            "eta_seconds": state["eta_seconds"],
+        }
+        if log_line:
+            event["log"] = log_line
+        if final:
+            event["result"] = state["result"]
+            event["error"] = state["error"]
+            event["finished_at"] = state["finished_at"]
+        for subscription in list(subscribers):
+            subscription.offer(event)
+
+    async def snapshot(self, task_id: str) -> Optional[dict]:
+        state = await self.get(task_id)
+        if state is None:
+            return None
+        return {"type": "snapshot", **state}
+
+    async def _save(self, state: dict, log_line: Optional[str] = None):
+        self._publish(state, log_line)
+        await self.db.execute('''
+            UPDATE background_tasks
+            SET status = ?, progress = ?, current_operation = ?, logs = ?, eta_seconds = ?,
+                result = ?, error = ?, started_at = ?, finished_at = ?
+            WHERE id = ?
+        ''', (
+            state["status"], state["progress"], state["current_operation"], json.dumps(state["logs"]),
+            state["eta_seconds"], json.dumps(state["result"]) if state["result"] is not None else None,
+            state["error"], state["started_at"], state["finished_at"], state["task_id"],
+        ))
+
+    async def start(self):
+        """Start workers and pick up jobs left unfinished by a previous process"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._high_queue = asyncio.PriorityQueue()
+        rows = await self.db.fetchall(f'''
+            SELECT id, task_type, user_id, priority, params, status, logs, created_at FROM background_tasks
+            WHERE status IN ({", ".join("?" * len(ACTIVE_STATUSES))})
+            ORDER BY created_at ASC
+        ''', ACTIVE_STATUSES)
+        for task_id, task_type, user_id, priority, params, status, logs, created_at in rows:
+            state = self._new_state(task_id, task_type, user_id, priority, json.loads(params), created_at)
+            state["logs"] = json.loads(logs)
+            if task_type not in self.handlers or (status == "running" and task_type not in self.idempotent):
+                # Emergency dispatch or form submission may already have happened: never repeat it
+                detail = "Interrupted by restart" if task_type in self.handlers else f"Unknown task type: {task_type}"
+                await self._mark_failed(state, detail)
+                continue
+            state["logs"].append(f"{datetime.now().strftime('%H:%M:%S')} Re-queued after restart")
+            self._states[task_id] = state
+            await self._save(state)
+            self._enqueue(priority, task_id)
+        self._workers = [asyncio.create_task(self._worker(self._queue)) for _ in range(self.worker_count)]
+        self._workers += [
+            asyncio.create_task(self._worker(self._high_queue)) for _ in range(self.high_priority_worker_count)
+        ]
+
+    async def stop(self):
+        """Stop workers; running jobs stay 'running' in the table until the next start"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._high_queue = None
+
+    def _enqueue(self, priority: int, task_id: str):
+        entry = (priority, next(self._sequence), task_id)
+        self._queue.put_nowait(entry)
+        if priority <= PRIORITY_HIGH:
+            self._high_queue.put_nowait(entry)
+
+    def _new_state(self, task_id: str, task_type: str, user_id: Optional[str], priority: int,
+                   params: dict, created_at: str) -> dict:
+        return {
+            "task_id": task_id,
+            "task_type": task_type,
+            "user_id": user_id,
+            "priority": priority,
+            "params": params,
+            "status": "queued",
+            "progress": 0.0,
+            "current_operation": "Waiting for a worker",
+            "logs": [],
+            "eta_seconds": None,
+            "result": None,
+            "error": None,
+            "created_at": created_at,
+            "started_at": None,
+            "finished_at": None,
+        }
+
+    async def submit(self, task_type: str, params: dict, user_id: Optional[str] = None,
+                     priority: int = PRIORITY_NORMAL) -> str:
+        """Persist and enqueue a job, returning its task_id immediately"""
+        if task_type not in self.handlers:
+            raise ValueError(f"Unknown task type: {task_type}")
+        if self._queue is None:
+            await self.start()
+
+        task_id = uuid.uuid4().hex
+        state = self._new_state(task_id, task_type, user_id, priority, params, datetime.now().isoformat())
+        state["logs"].append(f"{datetime.now().strftime('%H:%M:%S')} Task queued")
+        await self.db.execute('''
+            INSERT INTO background_tasks (id, task_type, user_id, priority, params, status, current_operation, logs, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (task_id, task_type, user_id, priority, json.dumps(params), state["status"],
+              state["current_operation"], json.dumps(state["logs"]), state["created_at"]))
+        self._states[task_id] = state
+        self._enqueue(priority, task_id)
+        return task_id
+
+    async def _worker(self, queue: asyncio.PriorityQueue):
+        while True:
+            _, _, task_id = await queue.get()
+            state = self._states.get(task_id)
+            if state is None or state["status"] != "queued" or task_id in self._running:
+                # Cancelled, or already claimed from the other queue
+                continue
+            task = asyncio.create_task(self._execute(state))
+            self._running[task_id] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.done():
+                    # Engine shutdown: abandon the job without marking it finished
+                    task.cancel()
+                    raise
+            except Exception as e:
+                # Saving the outcome failed (unserializable result, locked database, ...):
+                # record the job as failed and keep this worker alive for the rest of the queue
+                logger.exception("Background task %s could not be finished", task_id)
+                await self._mark_failed(state, f"Task could not be saved: {e}")
+            finally:
+                self._running.pop(task_id, None)
+
+    async def _execute(self, state: dict):
+        ctx = TaskContext(self, state)
+        state["status"] = "running"
+        state["started_at"] = datetime.now().isoformat()
+        state["current_operation"] = "Task started"
+        try:
+            await ctx.log("Task started")
+            result = await self.handlers[state["task_type"]](ctx, **state["params"])
+            state.update(status="completed", progress=100.0, eta_seconds=0,
+                         current_operation="Task completed", result=result)
+            line = "Task completed"
+        except asyncio.CancelledError:
+            if state["status"] != "cancelled":
+                raise
+            line = "Task cancelled"
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            logger.warning("Background task %s failed: %s", state["task_id"], detail)
+            state.update(status="failed", eta_seconds=0, current_operation="Task failed", error=detail)
+            line = f"Task failed: {detail}"
+        state["finished_at"] = datetime.now().isoformat()
+        await ctx.log(line)
+        self._states.pop(state["task_id"], None)
+
+    async def _mark_failed(self, state: dict, detail: str):
+        state.update(status="failed", eta_seconds=0, current_operation="Task failed",
+                     result=None, error=detail, finished_at=datetime.now().isoformat())
+        entry = f"{datetime.now().strftime('%H:%M:%S')} Task failed: {detail}"
+        state["logs"].append(entry)
+        try:
+            await self._save(state, log_line=entry)
+        except Exception:
+            logger.exception("Could not record failure of background task %s", state["task_id"])
+        finally:
+            self._states.pop(state["task_id"], None)
+
+    async def cancel(self, task_id: str) -> bool:
+        state = self._states.get(task_id)
+        if state is None or state["status"] not in ACTIVE_STATUSES:
+            return False
+        was_queued = state["status"] == "queued"
+        state.update(status="cancelled", current_operation="Task cancelled", eta_seconds=0)
+        running = self._running.get(task_id)
+        if running is not None:
+            running.cancel()
+        if was_queued:
+            state["finished_at"] = datetime.now().isoformat()
+            entry = f"{datetime.now().strftime('%H:%M:%S')} Task cancelled"
+            state["logs"].append(entry)
+            await self._save(state, log_line=entry)
+            self._states.pop(task_id, None)
+        return True
+
+    async def get(self, task_id: str) -> Optional[dict]:
+        """Current state of a job, from memory while active or from the table once finished"""
+        state = self._states.get(task_id)
+        if state is not None:
+            return {key: value for key, value in state.items() if key != "params"}
+
+        row = await self.db.fetchone('''
+            SELECT id, task_type, user_id, priority, status, progress, current_operation, logs,
+                   eta_seconds, result, error, created_at, started_at, finished_at
+            FROM background_tasks WHERE id = ?
+        ''', (task_id,))
+        if row is None:
+            return None
+        return {
+            "task_id": row[0],
+            "task_type": row[1],
+            "user_id": row[2],
+            "priority": row[3],
+            "status": row[4],
+            "progress": row[5],
+            "current_operation": row[6],
+            "logs": json.loads(row[7]),
+            "eta_seconds": row[8],
+            "result": json.loads(row[9]) if row[9] else None,
+            "error": row[10],
+            "created_at": row[11],
+            "started_at": row[12],
+            "finished_at": row[13],
+        }
+
+
+task_engine = TaskEngine()
@@ -0,0 +1,42 @@
+import os
+import asyncio
+import tempfile
+
+from fastapi import HTTPException, UploadFile
+
+# Chunked spooling of uploaded files to disk.
+# Uploads are copied in fixed-size blocks with a hard size cap, so memory use
+# per request stays at one block regardless of the file size.
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+VOICE_UPLOAD_MAX_BYTES = int(os.getenv("VOICE_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+
+
+async def spool_upload(upload: UploadFile, suffix: str = "",
+                       max_bytes: int = VOICE_UPLOAD_MAX_BYTES,
+                       chunk_size: int = UPLOAD_CHUNK_BYTES) -> str:
+    """Copy an upload to a temp file block by block and return its path
+
+    Raises HTTPException(413) once more than max_bytes have been received.
+    The temp file is removed on any failure; on success the caller owns it.
+    """
+    loop = asyncio.get_running_loop()
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    received = 0
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if received > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit"
+                    )
+                await loop.run_in_executor(None, spool.write, chunk)
+        return path
+    except BaseException:
+        os.unlink(path)
+        raise
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+# Deadline-bound workflow executor.
+# Independent channels run concurrently; within a channel, steps form a
+# fallback chain and the next step is only tried when the previous one fails
+# or times out. Every attempt is timed so callers can persist the breakdown.
+
+
+class Step:
+    """One attempt in a channel: an async action returning a result dict"""
+
+    def __init__(self, name: str, action: Callable[[], Awaitable[dict]], timeout: float):
+        self.name = name
+        self.action = action
+        self.timeout = timeout
+
+
+class Channel:
+    """An ordered fallback chain of steps"""
+
+    def __init__(self, name: str, steps: List[Step]):
+        self.name = name
+        self.steps = steps
+
+
+async def run_step(step: Step, channel: str, started: float, deadline: float) -> dict:
+    offset = time.perf_counter() - started
+    remaining = deadline - offset
+    attempt = {
+        "channel": channel,
+        "step": step.name,
+        "started_ms": round(offset * 1000, 1),
+        "result": None,
+    }
+    if remaining <= 0:
+        attempt.update(status="skipped", duration_ms=0.0, error="workflow deadline reached")
+        return attempt
+
+    try:
+        result = await asyncio.wait_for(step.action(), min(step.timeout, remaining))
+        attempt["result"] = result
+        attempt["status"] = "success" if result.get("status") == "success" else "failed"
+    except asyncio.TimeoutError:
+        attempt["status"] = "timeout"
+        attempt["error"] = f"no response within {min(step.timeout, remaining):.1f}s"
+    except Exception as e:
+        attempt["status"] = "failed"
+        attempt["error"] = str(e)
+    attempt["duration_ms"] = round((time.perf_counter() - started - offset) * 1000, 1)
+    return attempt
+
+
+async def run_channel(channel: Channel, started: float, deadline: float) -> dict:
+    attempts = []
+    for step in channel.steps:
+        attempt = await run_step(step, channel.name, started, deadline)
+        attempts.append(attempt)
+        if attempt["status"] == "success":
+            break
+    return {
+        "status": "success" if attempts and attempts[-1]["status"] == "success" else "failed",
+        "attempts": attempts,
+    }
+
+
+async def run_workflow(channels: List[Channel], deadline: float) -> dict:
+    """Run all channels concurrently within an overall deadline (seconds)
+
+    Returns the overall status ("completed", "degraded" when some channels
+    exhausted their fallbacks, "failed" when none succeeded), per-channel
+    outcomes, a flat list of timed attempts and the total duration.
+    """
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(run_channel(c, started, deadline) for c in channels))
+
+    succeeded = sum(1 for outcome in outcomes if outcome["status"] == "success")
+    if succeeded == len(channels):
+        status = "completed"
+    elif succeeded:
+        status = "degraded"
+    else:
+        status = "failed"
+
+    return {
+        "status": status,
+        "channels": {c.name: o["status"] for c, o in zip(channels, outcomes)},
+        "attempts": [attempt for outcome in outcomes for attempt in outcome["attempts"]],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
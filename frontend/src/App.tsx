@@ -31,7 +31,7 @@ import {
 import AuthModal from "./components/AuthModal";
 import ProfilePage from "./components/ProfilePage";
 import SecurityGate from "./components/SecurityGate";
-import { authService, onAuthStateChange, UserProfile } from "./firebase";
+import { authHeaders, authService, onAuthStateChange, UserProfile } from "./firebase";
 
 // Phase 4 Components
 import TaskLibrary from "./components/TaskLibrary";
@@ -269,7 +269,9 @@ export default function App() {
 
     setIsYoutubeLoading(true);
     try {
-      const response = await fetch(`/api/yt-summary?topic=${encodeURIComponent(youtubeQuery)}`);
+      const response = await fetch(`/api/yt-summary?topic=${encodeURIComponent(youtubeQuery)}`, {
+        headers: await authHeaders(),
+      });
       if (response.ok) {
         const result = await response.json();
         setYoutubeResults(result.summaries);
@@ -504,6 +506,7 @@ export default function App() {
         
         const response = await fetch('/api/task-execute', {
           method: 'POST',
+          headers: await authHeaders(),
           body: formData,
         });
         
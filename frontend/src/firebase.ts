@@ -200,6 +200,13 @@ export const authService = {
   }
 };
 
+// Authorization header with the signed-in user's Firebase ID token (empty when signed out),
+// so the backend can verify the caller and apply their plan's rate limits
+export const authHeaders = async (): Promise<Record<string, string>> => {
+  const token = await auth.currentUser?.getIdToken();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 // Auth state observer
 export const onAuthStateChange = (callback: (user: User | null) => void) => {
   return onAuthStateChanged(auth, callback);
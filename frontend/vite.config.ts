@@ -17,6 +17,8 @@ export default defineConfig({
       '/api': {
         target: 'http://localhost:8000',
         changeOrigin: true,
+        // Pass the browser's address on so per-IP rate limits see real clients
+        xfwd: true,
         rewrite: (path) => path.replace(/^\/api/, ''),
       },
     },